@@ -0,0 +1,69 @@
+"""visit time of synthetic packages with thousands of declarations and statements.
+
+    python3 benchmarks/aggregation.py [statements ...]
+
+each package is parsed once, then visited with the current aggregation and with the
+quadratic one it replaced, that rebuilt the whole aggregate for every child"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "lib"), os.path.join(ROOT, "built"), os.path.join(ROOT, "runtime_libs")]
+
+from AntlrCaseInsensitiveFileInputStream import AntlrCaseInsensitiveInputStream
+from BaseVisitor import BaseVisitor
+from ScriptVisitor import ScriptVisitor
+from parsing import parse
+
+DEFAULT_SIZES = [500, 1000, 2000, 4000]
+
+def synthetic_package(statements: int) -> str:
+    lines = ["create or replace package body SYNTHETIC as", "procedure RUN is"]
+    lines += [f"  V{i} number := {i};" for i in range(statements)]
+    lines.append("begin")
+    lines += [f"  V{i} := V{i} + {i};" for i in range(statements)]
+    lines += ["end;", "end;", "/", ""]
+    return "\n".join(lines)
+
+def quadratic_aggregate_result(_, aggregate, nextResult):
+    if aggregate is None:
+        aggregate = []
+    if nextResult is None:
+        return aggregate
+    aggregate.append(nextResult)
+    return [elem for elem in _find_elems(aggregate)]
+
+def _find_elems(arr):
+    if arr is None:
+        return
+    if not isinstance(arr, list):
+        yield arr
+        return
+    for elem in arr:
+        yield from _find_elems(elem)
+
+def time_visit(tree, aggregate_result) -> float:
+    current = BaseVisitor.aggregateResult
+    BaseVisitor.aggregateResult = aggregate_result
+    try:
+        start = time.perf_counter()
+        tree.accept(ScriptVisitor())
+        return time.perf_counter() - start
+    finally:
+        BaseVisitor.aggregateResult = current
+
+def main(argv):
+    sizes = [int(arg) for arg in argv[1:]] or DEFAULT_SIZES
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    print(f"{'statements':>10} {'parse':>8} {'linear':>8} {'quadratic':>10}")
+    for size in sizes:
+        start = time.perf_counter()
+        tree = parse(AntlrCaseInsensitiveInputStream(synthetic_package(size)))
+        parse_time = time.perf_counter() - start
+        linear = time_visit(tree, BaseVisitor.aggregateResult)
+        quadratic = time_visit(tree, quadratic_aggregate_result)
+        print(f"{size:10} {parse_time:8.2f} {linear:8.3f} {quadratic:10.3f}")
+
+if __name__ == '__main__':
+    main(sys.argv)
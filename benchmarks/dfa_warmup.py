@@ -0,0 +1,41 @@
+"""cold vs warm parser startup of single-file S2S runs.
+
+    python3 benchmarks/dfa_warmup.py [corpus_dir]
+
+cold runs start with an empty DFA, like S2S always did. warm runs preload a DFA
+persisted by one batch pass over the corpus (--dfa-cache)"""
+import os
+import sys
+import glob
+import time
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+S2S = os.path.join(ROOT, "lib", "S2S.py")
+
+def run_s2s(*args) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, S2S] + list(args), cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def main(argv):
+    corpus = argv[1] if len(argv) > 1 else os.path.join(ROOT, "tests", "pkgs")
+    pkgs = sorted(glob.glob(os.path.join(corpus, "*.pkg")))
+    with tempfile.TemporaryDirectory() as tmp:
+        dfa_filename = os.path.join(tmp, "dfa.pickle")
+        output = os.path.join(tmp, "out.py")
+        warmup = run_s2s("--batch", corpus, os.path.join(tmp, "batch"), "--jobs", "1", "--dfa-cache", dfa_filename)
+        print(f"DFA of {len(pkgs)} packages persisted in {warmup:.2f}s, {os.path.getsize(dfa_filename) / 2**20:.1f}MB\n")
+        print(f"{'package':40} {'cold':>8} {'warm':>8} {'speedup':>8}")
+        total_cold = total_warm = 0
+        for pkg in pkgs:
+            cold = run_s2s(pkg, output)
+            warm = run_s2s(pkg, output, "--dfa-cache", dfa_filename)
+            total_cold += cold
+            total_warm += warm
+            print(f"{os.path.basename(pkg):40} {cold:8.2f} {warm:8.2f} {cold / warm:7.1f}x")
+        print(f"{'total':40} {total_cold:8.2f} {total_warm:8.2f} {total_cold / total_warm:7.1f}x")
+
+if __name__ == '__main__':
+    main(sys.argv)
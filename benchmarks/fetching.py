@@ -0,0 +1,50 @@
+"""run time of fetching every row of a cursor, by the number of rows fetched from the driver at once.
+
+    python3 benchmarks/fetching.py [rows ...]
+
+the driver is the fake one of MOCKPLCURSOR, so the time is the one spent in Python:
+a real driver adds a round trip to the database per fetch from it"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "runtime_libs")]
+
+from Mutable import m
+from PLCURSOR import PLCURSOR
+from MOCKPLCURSOR import MOCKPLCURSOR
+
+DEFAULT_ROWS = [10000, 100000]
+ARRAYSIZES = [1, 10, 100, 1000]
+# the best run counts
+REPEAT = 3
+
+def fetch_all(rows: int, arraysize: int) -> float:
+    mock = MOCKPLCURSOR.MOCKSQL(m("SELECT"))
+    mock.RETURNS(m(repr([[i, f"row {i}"] for i in range(rows)])))
+    cursor = PLCURSOR.CURSOR("SELECT ID, DESCRIPTION FROM DATA", None, [], arraysize=arraysize)
+    nuid, sbdescription = m(), m()
+    start = time.perf_counter()
+    cursor.OPEN([])
+    cursor.FETCH(nuid, sbdescription)
+    while cursor.found:
+        cursor.FETCH(nuid, sbdescription)
+    cursor.CLOSE()
+    elapsed = time.perf_counter() - start
+    assert cursor.rowcount == rows
+    return elapsed
+
+def main(argv):
+    counts = [int(arg) for arg in argv[1:]] or DEFAULT_ROWS
+    PLCURSOR.SETUP("mock@database")
+    print(f"{'rows':>10} {'arraysize':>10} {'s':>10} {'speedup':>8}")
+    for rows in counts:
+        baseline = None
+        for arraysize in ARRAYSIZES:
+            elapsed = min(fetch_all(rows, arraysize) for _ in range(REPEAT))
+            baseline = baseline or elapsed
+            print(f"{rows:10} {arraysize:10} {elapsed:10.3f} {baseline / elapsed:7.1f}x")
+
+if __name__ == '__main__':
+    main(sys.argv)
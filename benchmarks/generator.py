@@ -0,0 +1,77 @@
+"""synthetic PL/SQL packages, as big or as deep as asked.
+
+    python3 benchmarks/generator.py --procedures 50 --variables 20 --depth 10 --cursors 5 > big.pkg
+
+the package only uses what the transpiler supports: a spec with globals, a body with
+procedures that declare variables and cursors, nested IFs and LOOPs, and a block that calls them"""
+import sys
+import argparse
+
+def generate_package(procedures: int = 10, variables: int = 10, depth: int = 3, cursors: int = 1,
+                     globals_count: int = 10, statements: int = 10, name: str = "SYNTHETIC") -> str:
+    lines = [f"create or replace package {name} as"]
+    lines += [f"  G{i} number := {i};" for i in range(globals_count)]
+    lines += [f"  procedure P{i}(INP number);" for i in range(procedures)]
+    lines += [f"end {name};", "/", "", f"create or replace package body {name} as"]
+    for i in range(procedures):
+        lines += _procedure(i, variables, depth, cursors, globals_count, statements)
+    lines += [f"end {name};", "/", "", "begin"]
+    lines += [f"  {name}.P{i}({i});" for i in range(procedures)]
+    lines += ["end;", "/", ""]
+    return "\n".join(lines)
+
+def _procedure(index: int, variables: int, depth: int, cursors: int, globals_count: int, statements: int):
+    lines = [f"procedure P{index}(INP number) is"]
+    lines += [f"  V{i} number := {i};" for i in range(variables)]
+    lines.append("  SBTEXT varchar2(100) := 'text';")
+    for i in range(cursors):
+        lines += [
+            f"  cursor CU{i}(INID number) is",
+            f"    select id, description from table_{i} where id = INID and value > INP;",
+        ]
+    lines.append("begin")
+    for i in range(statements):
+        target = f"V{i % variables}" if variables else "SBTEXT"
+        operand = f"G{i % globals_count}" if globals_count else str(i)
+        if variables:
+            lines.append(f"  {target} := {target} + {operand} * {i};")
+        else:
+            lines.append(f"  SBTEXT := SBTEXT || '{i}';")
+    for i in range(cursors):
+        lines += [
+            f"  open CU{i}(INP);",
+            f"  fetch CU{i} into V0, SBTEXT;" if variables else f"  fetch CU{i} into SBTEXT, SBTEXT;",
+            f"  close CU{i};",
+        ]
+    lines += _nested(depth, variables)
+    lines += ["  dbms_output.put_line(SBTEXT);", f"end P{index};", ""]
+    return lines
+
+def _nested(depth: int, variables: int):
+    """alternates IFs and LOOPs, depth levels deep"""
+    counter = "V0" if variables else "INP"
+    opening, closing = [], []
+    for level in range(depth):
+        indent = "  " * (level + 1)
+        if level % 2 == 0:
+            opening.append(f"{indent}if {counter} > {level} then")
+            closing.append(f"{indent}else\n{indent}  SBTEXT := 'else {level}';\n{indent}end if;")
+        else:
+            opening.append(f"{indent}loop")
+            closing.append(f"{indent}  exit when {counter} > {level};\n{indent}end loop;")
+    body = "  " * (depth + 1) + "SBTEXT := SBTEXT || 'deep';"
+    return opening + [body] + list(reversed(closing))
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="generator", description="writes a synthetic PL/SQL package to stdout")
+    parser.add_argument("--procedures", type=int, default=10)
+    parser.add_argument("--variables", type=int, default=10, help="declared in each procedure")
+    parser.add_argument("--depth", type=int, default=3, help="of the nested IFs and LOOPs in each procedure")
+    parser.add_argument("--cursors", type=int, default=1, help="declared and fetched in each procedure")
+    parser.add_argument("--globals", type=int, default=10, help="declared in the package spec")
+    parser.add_argument("--statements", type=int, default=10, help="assignments in each procedure")
+    args = parser.parse_args(argv[1:])
+    sys.stdout.write(generate_package(args.procedures, args.variables, args.depth, args.cursors, args.globals, args.statements))
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,59 @@
+"""run time of the statements of the generated code that only touch the runtime core: Mutable, NULL and PLHELPER.
+
+    python3 benchmarks/runtime.py [--number 200000]
+
+each statement is timed with timeit, as generated with --no-optimize, the best of a few runs"""
+import os
+import sys
+import timeit
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "runtime_libs")]
+
+SETUP = "\n".join([
+    "from PLHELPER import *",
+    "NUX = m(10)",
+    "NUY = m(3)",
+    "NUNULL = m()",
+    "SBNAME = m('Rachel')",
+    "BOFLAG = m(True)",
+    "_k0 = Constant(1)",
+    "_k1 = Constant(2)",
+])
+
+STATEMENTS = {
+    "declare": "NUZ = m()",
+    "literal": "m(5)",
+    "null": "m(NULL())",
+    "add": "NUX <<= NUX() + _k0",
+    "arithmetic": "NUY() * _k1 - NUX() % _k1",
+    "compare": "NUX() > NUY()",
+    "equal": "NUX() == _k0",
+    "null arithmetic": "NUNULL() + _k0",
+    "null compare": "NUNULL() < NUX()",
+    "isnull": "ISNULL(NUNULL())",
+    "not": "NOT(BOFLAG())",
+    "concat": "CONCAT(SBNAME(), _k0)",
+    "loop body": "\n".join([
+        "if NUX() > NUY() and not ISNULL(NUX()):",
+        "    NUY <<= NUY() + NUX() * _k1",
+        "    NUY <<= NUY() - NUX() * _k1",
+    ]),
+}
+REPEAT = 5
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="runtime", description="times the runtime core")
+    parser.add_argument("--number", type=int, default=200000, help="runs of each statement per timing")
+    args = parser.parse_args(argv[1:])
+    print(f"{'statement':16} {'ns':>8}")
+    for name, statement in STATEMENTS.items():
+        namespace = {}
+        exec(SETUP, namespace) # pylint: disable=I0011,W0122
+        # the variables are module level, as those of a package
+        best = min(timeit.repeat(statement, "global NUX, NUY, NUZ", repeat=REPEAT, number=args.number, globals=namespace))
+        print(f"{name:16} {best / args.number * 1e9:8.0f}")
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,133 @@
+"""run time of a generated package over a real database: SQLite, in a file.
+
+    python3 benchmarks/sqlite.py [rows ...]
+
+the package loads the rows with FORALL, in batches, then reads them back with a cursor FETCH loop,
+by arraysize, and with BULK COLLECT ... LIMIT. the time is the one of the generated code, the runtime
+and the database together"""
+import os
+import sys
+import time
+import tempfile
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT) # S2S finds the generated parser in ./built
+sys.path[:0] = [os.path.join(ROOT, "lib"), os.path.join(ROOT, "built"), os.path.join(ROOT, "runtime_libs")]
+
+import S2S
+from Mutable import m
+from PLCURSOR import PLCURSOR, execute_immediate_into
+from PLSESSION import session
+
+DEFAULT_ROWS = [10000, 100000]
+ARRAYSIZES = [1, 100, 1000]
+BATCH = 1000
+
+PACKAGE = f"""
+create or replace package pkgbench is
+    procedure load(inuRows number);
+    function scan return number;
+    function bulk return number;
+end;
+/
+
+create or replace package body pkgbench is
+
+    type tytbIds is table of number index by binary_integer;
+    type tytbNames is table of varchar2(100) index by binary_integer;
+
+    cursor cuRows is
+        select id, name from rows_data;
+
+    procedure load(inuRows number) is
+        tbIds   tytbIds;
+        tbNames tytbNames;
+        nuIdx   number := 0;
+    begin
+        for i in 1..inuRows loop
+            nuIdx := nuIdx + 1;
+            tbIds(nuIdx) := i;
+            tbNames(nuIdx) := 'row ' || i;
+            if nuIdx = {BATCH} or i = inuRows then
+                forall j in 1..nuIdx
+                    insert into rows_data (id, name) values (tbIds(j), tbNames(j));
+                tbIds.delete;
+                tbNames.delete;
+                nuIdx := 0;
+            end if;
+        end loop;
+        commit;
+    end;
+
+    function scan return number is
+        nuId    number;
+        sbName  varchar2(100);
+        nuTotal number := 0;
+    begin
+        open cuRows;
+        fetch cuRows into nuId, sbName;
+        while cuRows%found loop
+            nuTotal := nuTotal + nuId;
+            fetch cuRows into nuId, sbName;
+        end loop;
+        close cuRows;
+        return nuTotal;
+    end;
+
+    function bulk return number is
+        tbIds   tytbIds;
+        tbNames tytbNames;
+        nuCount number := 0;
+    begin
+        open cuRows;
+        fetch cuRows bulk collect into tbIds, tbNames limit {BATCH};
+        while tbIds.count > 0 loop
+            nuCount := nuCount + tbIds.count;
+            fetch cuRows bulk collect into tbIds, tbNames limit {BATCH};
+        end loop;
+        close cuRows;
+        return nuCount;
+    end;
+end;
+/
+"""
+
+def load_module(filename: str):
+    spec = importlib.util.spec_from_file_location("pkgbench", filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+def main(argv):
+    counts = [int(arg) for arg in argv[1:]] or DEFAULT_ROWS
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "pkgbench.pkg")
+        with open(filename, "w") as file:
+            file.write(PACKAGE)
+        S2S.transpile_file(filename, os.path.join(tmp, "pkgbench.py"))
+        package = load_module(os.path.join(tmp, "pkgbench.py")).PKGBENCH
+        print(f"{'rows':>10} {'operation':>16} {'s':>10} {'rows/s':>12}")
+        for rows in counts:
+            # the connection is closed at the end of the session
+            with session():
+                PLCURSOR.SETUP(f"sqlite:{os.path.join(tmp, f'bench{rows}.db')}")
+                execute_immediate_into("create table rows_data (id integer, name varchar2(100))")
+                elapsed, _ = timed(package.LOAD, m(rows))
+                print(f"{rows:10} {'forall insert':>16} {elapsed:10.3f} {rows / elapsed:12.0f}")
+                for arraysize in ARRAYSIZES:
+                    PLCURSOR.arraysize = arraysize
+                    elapsed, total = timed(package.SCAN)
+                    assert total.value == rows * (rows + 1) // 2
+                    print(f"{rows:10} {f'fetch by {arraysize}':>16} {elapsed:10.3f} {rows / elapsed:12.0f}")
+                elapsed, count = timed(package.BULK)
+                assert count.value == rows
+                print(f"{rows:10} {'bulk collect':>16} {elapsed:10.3f} {rows / elapsed:12.0f}")
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,123 @@
+"""lex, parse, visit and emit time, and peak memory, of S2S over synthetic packages.
+
+    python3 benchmarks/suite.py [--cases procedures,nesting] [--repeat 3] [--results FILE]
+
+every run is appended to the results file (built/bench/results.jsonl by default),
+and compared with the previous one. a case is timed with the phases of --profile, and
+its peak memory is measured by tracemalloc in a run of its own, since tracing slows it down"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import datetime
+import subprocess
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT) # S2S finds the generated parser in ./built
+sys.path[:0] = [os.path.join(ROOT, "lib"), os.path.join(ROOT, "built"), os.path.join(ROOT, "runtime_libs")]
+
+from generator import generate_package
+from profiling import Profile
+import S2S
+
+DEFAULT_RESULTS = os.path.join(ROOT, "built", "bench", "results.jsonl")
+PHASES = ("lex", "parse", "visit", "emit")
+# a change under this is noise
+REGRESSION_THRESHOLD = 0.10
+
+CASES = {
+    "procedures": dict(procedures=200, variables=5, depth=2, cursors=0, globals_count=10, statements=5),
+    "variables": dict(procedures=1, variables=2000, depth=1, cursors=0, globals_count=0, statements=2000),
+    "globals": dict(procedures=5, variables=2, depth=1, cursors=0, globals_count=2000, statements=200),
+    "nesting": dict(procedures=2, variables=2, depth=60, cursors=0, globals_count=2, statements=2),
+    "cursors": dict(procedures=10, variables=2, depth=1, cursors=20, globals_count=2, statements=2),
+}
+
+def run_case(filename: str, output_filename: str, repeat: int) -> dict:
+    """the best of repeat runs, per phase"""
+    best = None
+    for _ in range(repeat):
+        profile = Profile(detailed=False)
+        start = time.perf_counter()
+        S2S.transpile_file(filename, output_filename, profile=profile)
+        result = {"total": time.perf_counter() - start}
+        phases = profile.sections["phases"]
+        for phase in PHASES:
+            result[phase] = sum(timing.total for name, timing in phases.items() if name.split(" ")[0] == phase)
+        if best is None or result["total"] < best["total"]:
+            best = result
+    tracemalloc.start()
+    S2S.transpile_file(filename, output_filename)
+    best["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return best
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def last_results(filename: str) -> dict:
+    try:
+        with open(filename) as file:
+            lines = [line for line in file if line.strip()]
+    except FileNotFoundError:
+        return None
+    return json.loads(lines[-1]) if lines else None
+
+def save_results(filename: str, results: dict):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, "a") as file:
+        file.write(json.dumps(results, sort_keys=True) + "\n")
+
+def print_case(name: str, result: dict, previous: dict):
+    columns = PHASES + ("total", "peak_mb")
+    cells = []
+    for column in columns:
+        cell = f"{result[column]:8.3f}"
+        if previous and previous.get(column):
+            change = result[column] / previous[column] - 1
+            mark = "!" if change > REGRESSION_THRESHOLD else " "
+            cell += f" {change:+5.0%}{mark}"
+        cells.append(cell)
+    print(f"{name:12} " + " ".join(cells))
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="suite", description="benchmarks S2S over synthetic packages")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"comma separated, out of {', '.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case. the best one counts")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="the JSON lines file with the history of the runs")
+    args = parser.parse_args(argv[1:])
+    names = args.cases.split(",")
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000)) # the nesting case is deep
+    previous = last_results(args.results)
+    results = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "cases": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        # the first parse warms the DFA up. it would be charged to the first case otherwise
+        warmup = os.path.join(tmp, "warmup.pkg")
+        with open(warmup, "w") as file:
+            file.write(generate_package())
+        S2S.transpile_file(warmup, os.path.join(tmp, "warmup.py"))
+        print(f"{'case':12} " + " ".join(f"{column:>8}" + (" " * 7 if previous else "") for column in PHASES + ("total", "peak_mb")))
+        for name in names:
+            filename = os.path.join(tmp, name + ".pkg")
+            with open(filename, "w") as file:
+                file.write(generate_package(name=name.upper(), **CASES[name]))
+            result = run_case(filename, os.path.join(tmp, name + ".py"), args.repeat)
+            results["cases"][name] = result
+            print_case(name, result, previous and previous["cases"].get(name))
+    save_results(args.results, results)
+    print(f"\nsaved to {os.path.relpath(args.results, ROOT)}" + (f", compared with {previous['commit']} of {previous['date']}" if previous else ""))
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,98 @@
+"""run time of numeric loops, with their locals and indexes unboxed by the optimizer and without.
+
+    python3 benchmarks/unboxing.py [iterations ...]
+
+each package is transpiled twice, with and without --no-optimize, and each module is
+imported and run. only the run is timed"""
+import os
+import sys
+import time
+import tempfile
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT) # S2S finds the generated parser in ./built
+sys.path[:0] = [os.path.join(ROOT, "lib"), os.path.join(ROOT, "built"), os.path.join(ROOT, "runtime_libs")]
+
+import S2S
+
+DEFAULT_ITERATIONS = [10000, 100000]
+
+def while_package(iterations: int) -> str:
+    return "\n".join([
+        "declare",
+        "  function checksum(n number) return number is",
+        "    nui number := 0;",
+        "    nusum number := 0;",
+        "    nuodd number := 0;",
+        "  begin",
+        "    while nui < n loop",
+        "      nui := nui + 1;",
+        "      nusum := nusum + nui * 3 - nuodd;",
+        "      if nui - nuodd * 2 > 1 then",
+        "        nuodd := nuodd + 1;",
+        "      end if;",
+        "    end loop;",
+        "    return nusum;",
+        "  end;",
+        "  nuresult number;",
+        "begin",
+        f"  nuresult := checksum({iterations});",
+        "end;",
+        "/",
+        "",
+    ])
+
+def for_package(iterations: int) -> str:
+    """the index is passed to a procedure too, so it is boxed there"""
+    return "\n".join([
+        "declare",
+        "  procedure accumulate(total in out number, value number) is",
+        "  begin",
+        "    total := total + value;",
+        "  end;",
+        "  nutotal number := 0;",
+        "  nusum number := 0;",
+        "begin",
+        f"  for i in 1..{iterations} loop",
+        "    nusum := nusum + i * 2;",
+        "    if mod(i, 1000) = 0 then",
+        "      nusum := nusum + 1;",
+        "    end if;",
+        "  end loop;",
+        f"  for i in reverse 1..{iterations // 10} loop",
+        "    accumulate(nutotal, i);",
+        "  end loop;",
+        "end;",
+        "/",
+        "",
+    ])
+
+PACKAGES = {"while": while_package, "for": for_package}
+
+def run_module(filename: str) -> float:
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(filename))[0], filename)
+    module = importlib.util.module_from_spec(spec)
+    start = time.perf_counter()
+    spec.loader.exec_module(module)
+    return time.perf_counter() - start
+
+def main(argv):
+    iterations = [int(arg) for arg in argv[1:]] or DEFAULT_ITERATIONS
+    print(f"{'loop':6} {'iterations':>10} {'boxed s':>10} {'unboxed s':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, package in PACKAGES.items():
+            for count in iterations:
+                filename = os.path.join(tmp, f"{name}{count}.pkg")
+                with open(filename, "w") as file:
+                    file.write(package(count))
+                boxed = os.path.join(tmp, f"{name}_boxed{count}.py")
+                unboxed = os.path.join(tmp, f"{name}_unboxed{count}.py")
+                S2S.transpile_file(filename, boxed, optimize=False)
+                S2S.transpile_file(filename, unboxed)
+                boxed_time = run_module(boxed)
+                unboxed_time = run_module(unboxed)
+                print(f"{name:6} {count:10} {boxed_time:10.3f} {unboxed_time:10.3f} {boxed_time / unboxed_time:7.1f}x")
+
+if __name__ == '__main__':
+    main(sys.argv)
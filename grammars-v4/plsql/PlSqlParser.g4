@@ -1875,7 +1875,7 @@ open_statement
     ;
 
 fetch_statement
-    : FETCH cursor_name (it1=INTO (','? variable_name)+ | BULK COLLECT INTO (','? variable_name)+)
+    : FETCH cursor_name (it1=INTO (','? variable_name)+ | BULK COLLECT INTO (','? variable_name)+ (LIMIT expression)?)
     ;
 
 open_for_statement
@@ -1,13 +1,39 @@
+import re
+import mmap
+import codecs
 import antlr4
 
-class AntlrCaseInsensitiveFileInputStream(antlr4.FileStream):
+# LA() folds to upper case, so the lexer only has to know the upper case keywords
+_UPPER = bytes(range(128)).upper() + bytes(range(128, 256))
+_NON_ASCII = re.compile(rb"[\x80-\xff]")
 
-    def __init__(self, filename):
-        super().__init__(filename)
-        input_lower = self.strdata.upper()
-        self._lookaheadData = [ord(c) for c in input_lower]
+class AntlrCaseInsensitiveInputStream(antlr4.InputStream):
+    """an input stream that doesn't keep a list with an int per character.
+    ASCII input is served straight from a bytes-like buffer (bytes or an mmap), anything else from the str itself.
+    in both cases the case is folded in LA(), character by character"""
 
-    def LA(self, offset: int):
+    def __init__(self, data):
+        # antlr4.InputStream.__init__ is not called on purpose: it builds the list of ints
+        self.name = "<empty>"
+        self._index = 0
+        if isinstance(data, str):
+            try:
+                data = data.encode("ascii")
+            except UnicodeEncodeError:
+                self.LA = self._LA_str
+        self._data = data
+        self._size = len(data)
+
+    @property
+    def strdata(self):
+        return self.getText(0, self._size - 1)
+
+    def LA(self, offset: int): # pylint: disable=I0011,E0202
+        if offset == 1:
+            # the lexer asks for the next char almost every time
+            if self._index < self._size:
+                return _UPPER[self._data[self._index]]
+            return antlr4.Token.EOF
         if offset == 0:
             return 0 # undefined
         if offset < 0:
@@ -15,4 +41,48 @@ class AntlrCaseInsensitiveFileInputStream(antlr4.FileStream):
         pos = self._index + offset - 1
         if pos < 0 or pos >= self._size: # invalid
             return antlr4.Token.EOF
-        return self._lookaheadData[pos]
+        return _UPPER[self._data[pos]]
+
+    def _LA_str(self, offset: int):
+        if offset == 0:
+            return 0
+        if offset < 0:
+            offset += 1
+        pos = self._index + offset - 1
+        if pos < 0 or pos >= self._size:
+            return antlr4.Token.EOF
+        char = self._data[pos]
+        upper = char.upper()
+        if len(upper) != 1:
+            # ie: the upper case of ß is SS. such a char can't be part of a keyword anyway
+            return ord(char)
+        return ord(upper)
+
+    def getText(self, start: int, stop: int):
+        if stop >= self._size:
+            stop = self._size - 1
+        if start >= self._size:
+            return ""
+        text = self._data[start:stop + 1]
+        if isinstance(text, str):
+            return text
+        return text.decode("ascii")
+
+    def __str__(self):
+        return self.strdata
+
+class AntlrCaseInsensitiveFileInputStream(AntlrCaseInsensitiveInputStream):
+    """maps the file instead of reading it. an ASCII script is never copied into the Python heap"""
+
+    def __init__(self, filename: str, encoding: str = "ascii", errors: str = "strict"):
+        with open(filename, "rb") as file:
+            try:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # an empty file can't be mapped
+                data = b""
+        if _NON_ASCII.search(data):
+            # same as antlr4.FileStream: only ascii unless told otherwise
+            data = codecs.decode(bytes(data), encoding, errors)
+        super().__init__(data)
+        self.name = self.fileName = filename
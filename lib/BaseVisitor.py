@@ -1,6 +1,6 @@
 import sys
 import ast
-from common import full_flat_arr
+from common import Scope, flat_extend
 
 sys.path.append('./built')
 from PlSqlParserVisitor import PlSqlParserVisitor
@@ -12,19 +12,50 @@ class BaseVisitor(PlSqlParserVisitor):
 # pylint: disable=I0011,C0103
 
     def __init__(self):
-        self.pkgs_in_file = []
-        self.pkgs_calls_found = []
-        self.vars_in_package = []
-        self.vars_declared = []
+        self.pkgs_in_file = Scope()
+        self.pkgs_calls_found = Scope()
+        self.vars_in_package = Scope()
+        self.vars_declared = Scope()
         self.pkg_name: str = None
 
+    def get_state(self):
+        """what a unit of a script leaves behind for the units after it"""
+        return (self.pkgs_in_file, self.pkgs_calls_found, self.vars_in_package, self.vars_declared, self.pkg_name)
+
+    def set_state(self, state):
+        # vars_declared may be the very scope of vars_in_package. a pickled state keeps it that way
+        (self.pkgs_in_file, self.pkgs_calls_found, self.vars_in_package, self.vars_declared, self.pkg_name) = state
+
     def aggregateResult(self, aggregate, nextResult):
+        # the aggregate is flat already. only what the child returned needs flattening
         if aggregate is None:
             aggregate = []
-        if nextResult is None:
-            return aggregate
-        aggregate.append(nextResult)
-        return full_flat_arr(aggregate)
+        flat_extend(aggregate, nextResult)
+        return aggregate
+
+    def create_binds(self, params: list):
+        """the values of the binds of a statement, by their quoted name: {'"RC.ID"': RC.ID()}.
+        the fields of a record are bound one by one, as the sql names them"""
+        keys = []
+        values = []
+        for param in params:
+            value = self.bind_variable(param.varname)
+            if param.index:
+                # an element of a collection, ie: TB(I()).ID()
+                value = ast.Call(
+                    func=value,
+                    args=[ast.Call(func=self.bind_variable(param.index.varname), args=[], keywords=[])],
+                    keywords=[]
+                )
+            for attr in param.attrs:
+                value = ast.Attribute(value=value, attr=attr)
+            keys.append(ast.Str(s=f'"{param.bind_name()}"'))
+            values.append(ast.Call(func=value, args=[], keywords=[]))
+        return ast.Dict(keys=keys, values=values)
+
+    def bind_variable(self, name: str):
+        """the variable read for a bind"""
+        return ast.Name(id=name)
 
     def create_imports(self):
         imports = []
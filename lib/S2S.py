@@ -1,37 +1,322 @@
 import sys
+import os
 import ast
-import antlr4
-import astor
+import time
+import signal
+import argparse
+import traceback
+import multiprocessing
+import multiprocessing.util
 
-sys.path.append('./built')
-from PlSqlLexer import PlSqlLexer
-from PlSqlParser import PlSqlParser
-from PlSqlParserVisitor import PlSqlParserVisitor
-from ScriptVisitor import ScriptVisitor
 from AntlrCaseInsensitiveFileInputStream import AntlrCaseInsensitiveFileInputStream
+from cache import TranspileCache, DEFAULT_MAX_BYTES
+from S2SClient import DEFAULT_SOCKET
+import parsing
+import emitter
+import optimizer
+import asyncify
+from profiling import Profile, NULL_PROFILE
 
-def main(argv):
+sys.path.append('./built')
+
+PKG_EXTENSION = ".pkg"
+PY_EXTENSION = ".py"
+PYC_EXTENSION = ".pyc"
+
+_dfa_cache = None
+_worker_cache: TranspileCache = None
+_worker_dfa_cache_filename: str = None
+_worker_split = False
+_worker_pyc = False
+_worker_profiling = False
+_worker_optimize = True
+_worker_asynchronous = False
+
+def transpile_tree(input_filename: str, split: bool = False, jobs_count: int = 1, cache: TranspileCache = None,
+                   profile=NULL_PROFILE, optimize: bool = True, asynchronous: bool = False) -> ast.Module:
+    """with split, the units of the script are parsed one by one, in jobs_count processes,
+    and cached one by one in cache. with optimize, the locals that can be are unboxed.
+    with asynchronous, the procedures are coroutines that await the database"""
+    module = _visit_tree(input_filename, split, jobs_count, cache, profile)
+    if optimize:
+        with profile.phase("optimize"):
+            module = optimizer.optimize(module)
+    if asynchronous:
+        with profile.phase("asyncify"):
+            module = asyncify.asyncify(module)
+    return module
 
-    input_filename = argv[1]
-    output_filename = argv[2]
+def _visit_tree(input_filename: str, split: bool, jobs_count: int, cache: TranspileCache, profile) -> ast.Module:
+    # the generated parser takes seconds to import. a cache hit never gets here
+    if split:
+        from units import transpile_units
+        # same as the lexer input: ascii only, and the line endings untouched
+        with open(input_filename, encoding="ascii", newline="") as input_file:
+            text = input_file.read()
+        # the rules parsed in other processes can't be timed
+        return transpile_units(text, 1 if profile.enabled else jobs_count, cache, profile)
+    with profile.phase("import"):
+        from ScriptVisitor import ScriptVisitor
+        from SqlVisitor import SqlVisitor
+        from BaseVisitor import BaseVisitor
     input_file = AntlrCaseInsensitiveFileInputStream(input_filename)
-    lexer = PlSqlLexer(input_file)
-    stream = antlr4.CommonTokenStream(lexer)
-    parser = PlSqlParser(stream)
-    tree = parser.sql_script()
+    tree = parsing.parse(input_file, profile)
     visitor = ScriptVisitor()
-    node = tree.accept(visitor)
-    #print(ast.dump(node))
-    #astpretty.pprint(node) # este modulo esta malo. no usar :(
+    with profile.phase("visit"), profile.visitors(ScriptVisitor, SqlVisitor, BaseVisitor):
+        return tree.accept(visitor)
+
+def transpile(input_filename: str, split: bool = False, jobs_count: int = 1, cache: TranspileCache = None,
+              profile=NULL_PROFILE, optimize: bool = True, asynchronous: bool = False) -> str:
+    node = transpile_tree(input_filename, split, jobs_count, cache, profile, optimize, asynchronous)
+    with profile.phase("emit"):
+        return emitter.to_source(node)
+
+def open_dfa_cache(filename: str):
+    """loads the persisted parser DFA. only worth it when something is going to be parsed"""
+    from dfa_cache import DfaCache
+    dfa_cache = DfaCache(filename)
+    dfa_cache.load()
+    return dfa_cache
+
+def transpile_cached(input_filename: str, cache: TranspileCache = None, dfa_cache_filename: str = None,
+                     split: bool = False, jobs_count: int = 1, profile=NULL_PROFILE, optimize: bool = True,
+                     asynchronous: bool = False):
+    """returns the code, and True if it came from the cache"""
+    global _dfa_cache
+    code = None
+    if cache:
+        with open(input_filename, "rb") as input_file:
+            key = cache.key(input_file.read(), cache_options(optimize, asynchronous))
+        code = cache.get(key)
+    cached = code is not None
+    if not cached:
+        if dfa_cache_filename and _dfa_cache is None:
+            with profile.phase("load dfa"):
+                _dfa_cache = open_dfa_cache(dfa_cache_filename)
+        code = transpile(input_filename, split, jobs_count, cache, profile, optimize, asynchronous)
+        if cache:
+            cache.put(key, code)
+    return code, cached
+
+def transpile_file(input_filename: str, output_filename: str, cache: TranspileCache = None, dfa_cache_filename: str = None,
+                   split: bool = False, jobs_count: int = 1, pyc: bool = False, profile=NULL_PROFILE,
+                   optimize: bool = True, asynchronous: bool = False) -> bool:
+    """returns True if the code came from the cache. with pyc, the output is the compiled code"""
+    global _dfa_cache
+    start = time.perf_counter()
+    if cache:
+        code, cached = transpile_cached(input_filename, cache, dfa_cache_filename, split, jobs_count, profile, optimize,
+                                        asynchronous)
+        with profile.phase("emit"):
+            if pyc:
+                emitter.write_code(compile(code, output_filename, "exec"), output_filename)
+            else:
+                with emitter.open_output(output_filename) as output:
+                    output.write(code)
+        profile.add_file(input_filename, time.perf_counter() - start)
+        return cached
+    if dfa_cache_filename and _dfa_cache is None:
+        with profile.phase("load dfa"):
+            _dfa_cache = open_dfa_cache(dfa_cache_filename)
+    node = transpile_tree(input_filename, split, jobs_count, profile=profile, optimize=optimize, asynchronous=asynchronous)
+    with profile.phase("emit"):
+        if pyc:
+            emitter.write_pyc(node, output_filename)
+        else:
+            # streamed: the source of a big package is never held whole
+            with emitter.open_output(output_filename) as output:
+                emitter.write_source(node, output)
+    profile.add_file(input_filename, time.perf_counter() - start)
+    return False
+
+def cache_options(optimize: bool, asynchronous: bool) -> str:
+    """the options that change the code, for the key of the cache"""
+    options = [] if optimize else ["no-optimize"]
+    if asynchronous:
+        options.append("async")
+    return " ".join(options)
+
+def find_batch_jobs(source: str, output_dir: str, extension: str = PY_EXTENSION):
+    """returns the (input, output) pairs of a directory of .pkg files or a manifest.
+    each line of a manifest is an input filename, optionally followed by its output filename"""
+    if os.path.isdir(source):
+        jobs = []
+        for root, _, filenames in os.walk(source):
+            for filename in filenames:
+                if not filename.endswith(PKG_EXTENSION):
+                    continue
+                input_filename = os.path.join(root, filename)
+                relative = os.path.relpath(input_filename, source)
+                output_filename = os.path.join(output_dir, relative[:-len(PKG_EXTENSION)] + extension)
+                jobs.append((input_filename, output_filename))
+        return sorted(jobs)
+    jobs = []
+    with open(source) as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            input_filename, *output_filename = line.split(maxsplit=1)
+            if output_filename:
+                output_filename = output_filename[0]
+            else:
+                basename = os.path.splitext(os.path.basename(input_filename))[0]
+                output_filename = os.path.join(output_dir, basename + extension)
+            jobs.append((input_filename, output_filename))
+    return jobs
+
+def save_dfa_cache():
+    if _dfa_cache is not None:
+        _dfa_cache.save()
+
+def init_batch_worker(cache: TranspileCache, dfa_cache_filename: str, split: bool, pyc: bool, profiling: bool,
+                      optimize: bool, asynchronous: bool):
+    global _worker_cache, _worker_dfa_cache_filename, _worker_split, _worker_pyc, _worker_profiling, _worker_optimize
+    global _worker_asynchronous
+    _worker_cache = cache
+    _worker_dfa_cache_filename = dfa_cache_filename
+    _worker_split = split
+    _worker_pyc = pyc
+    _worker_profiling = profiling
+    _worker_optimize = optimize
+    _worker_asynchronous = asynchronous
+    # each worker persists what it learnt when the pool is closed. the last one to finish wins
+    multiprocessing.util.Finalize(None, save_dfa_cache, exitpriority=10)
+
+def batch_job(job):
+    """runs inside a pool worker. the parser DFA lives in the class, so it stays warm between jobs"""
+    input_filename, output_filename = job
+    fallbacks_before = parsing.ll_fallbacks
+    # a profile per job, merged by the parent
+    profile = Profile() if _worker_profiling else NULL_PROFILE
     try:
-        code = astor.to_source(node)
-    except:
-        print(ast.dump(node))
-        raise
+        output_dir = os.path.dirname(output_filename)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        # the units of a package are split in this worker. pool workers can't have a pool of their own
+        cached = transpile_file(input_filename, output_filename, _worker_cache, _worker_dfa_cache_filename,
+                                _worker_split, pyc=_worker_pyc, profile=profile, optimize=_worker_optimize,
+                                asynchronous=_worker_asynchronous)
+    except Exception: # pylint: disable=I0011,W0703
+        return input_filename, False, parsing.ll_fallbacks - fallbacks_before, traceback.format_exc(), None
+    profile_data = profile.to_dict() if profile.enabled else None
+    return input_filename, cached, parsing.ll_fallbacks - fallbacks_before, None, profile_data
+
+def batch(source: str, output_dir: str, jobs_count: int = None, cache: TranspileCache = None, dfa_cache_filename: str = None,
+          split: bool = False, pyc: bool = False, profile=NULL_PROFILE, optimize: bool = True,
+          asynchronous: bool = False) -> int:
+    jobs = find_batch_jobs(source, output_dir, PYC_EXTENSION if pyc else PY_EXTENSION)
+    jobs_count = jobs_count or os.cpu_count() or 1
+    jobs_count = max(1, min(jobs_count, len(jobs)))
+    failed = []
+    cached_count = 0
+    fallbacks_count = 0
+    pool = multiprocessing.Pool(processes=jobs_count, initializer=init_batch_worker, initargs=(cache, dfa_cache_filename, split, pyc, profile.enabled, optimize, asynchronous))
+    for input_filename, cached, fallbacks, error, profile_data in pool.imap_unordered(batch_job, jobs, chunksize=1):
+        fallbacks_count += fallbacks
+        if profile_data:
+            profile.merge(profile_data)
+        if error is None:
+            cached_count += cached
+            status = "cached" if cached else "ok (LL)" if fallbacks else "ok"
+            print(f"{status} {input_filename}")
+            continue
+        failed.append(input_filename)
+        print(f"error {input_filename}\n{error}", file=sys.stderr)
+    # close and join, not terminate: the workers have to run their finalizers
+    pool.close()
+    pool.join()
+    parsed_count = len(jobs) - cached_count
+    print(f"{len(jobs) - len(failed)} transpiled ({cached_count} from cache), {len(failed)} failed")
+    print(f"SLL prediction fell back to full LL in {fallbacks_count} of {parsed_count} parsed packages")
+    return 1 if failed else 0
+
+def serve_daemon(socket_filename: str, cache: TranspileCache = None, dfa_cache_filename: str = None, jobs_count: int = 1):
+    """serves transpile requests with a warm parser, on a unix socket or on stdin/stdout if socket_filename is -"""
+    global _dfa_cache
+    import daemon as transport
+    # pay for the imports and the DFA before the first request, not during it
+    import ScriptVisitor # pylint: disable=I0011,W0611
+    if dfa_cache_filename:
+        _dfa_cache = open_dfa_cache(dfa_cache_filename)
+
+    def handle(request: dict) -> dict:
+        fallbacks_before = parsing.ll_fallbacks
+        code, cached = transpile_cached(request["input"], cache, None, request.get("split", False), jobs_count,
+                                        optimize=request.get("optimize", True),
+                                        asynchronous=request.get("async", False))
+        response = {"cached": cached, "ll_fallback": parsing.ll_fallbacks > fallbacks_before}
+        output_filename = request.get("output")
+        if output_filename:
+            with emitter.open_output(output_filename) as output:
+                output.write(code)
+        else:
+            response["code"] = code
+        return response
+
+    # a SIGTERM still saves the DFA and removes the socket
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        if socket_filename == "-":
+            transport.serve_stdio(handle)
+        else:
+            transport.serve_socket(handle, socket_filename)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        save_dfa_cache()
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="S2S", description="PL/SQL to Python transcompiler")
+    parser.add_argument("input", nargs="?", help="the .pkg to transpile. a directory or a manifest with --batch")
+    parser.add_argument("output", nargs="?", help="the .py to write. the output directory with --batch")
+    parser.add_argument("--batch", action="store_true", help="transpile many packages in a worker pool")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="batch workers, or processes parsing the units with --split. defaults to the number of cores")
+    parser.add_argument("--split", action="store_true",
+                        help="parse the units of a script, separated by / lines, one by one. they are cached one by one too")
+    parser.add_argument("--cache", metavar="DIR", default=None, help="reuse the code of unchanged packages from DIR")
+    parser.add_argument("--cache-size", metavar="MB", type=int, default=DEFAULT_MAX_BYTES // 2**20,
+                        help="evict the least recently used entries over this size")
+    parser.add_argument("--dfa-cache", metavar="FILE", default=None,
+                        help="start from the parser DFA saved in FILE, and save it back once warmer")
+    parser.add_argument("--pyc", action="store_true", help="write the compiled code, a .pyc, instead of the source")
+    parser.add_argument("--no-optimize", dest="optimize", action="store_false",
+                        help="keep every variable a Mutable, instead of unboxing the locals that nothing else sees")
+    parser.add_argument("--async", dest="asynchronous", action="store_true",
+                        help="generate coroutines that await the database, for PLCURSOR_ASYNC")
+    parser.add_argument("--profile", action="store_true",
+                        help="report the time spent per phase, per parser rule and per visitor method on stderr")
+    parser.add_argument("--profile-json", metavar="FILE", default=None, help="save the profile as JSON in FILE")
+    parser.add_argument("--daemon", metavar="SOCKET", nargs="?", const=DEFAULT_SOCKET, default=None,
+                        help=f"serve S2SClient requests on SOCKET ({DEFAULT_SOCKET} by default), or on stdin/stdout with -")
+    args = parser.parse_args(argv[1:])
+    if not args.daemon and not (args.input and args.output):
+        parser.error("the input and the output are required")
 
-    output = open(output_filename, "w")
-    output.write(code)
-    output.close()
+    profile = Profile() if args.profile or args.profile_json else NULL_PROFILE
+    cache = None
+    if args.cache:
+        cache = TranspileCache(args.cache, args.cache_size * 2**20)
+    if args.daemon:
+        serve_daemon(args.daemon, cache, args.dfa_cache, args.jobs or 1)
+        status = 0
+    elif args.batch:
+        status = batch(args.input, args.output, args.jobs, cache, args.dfa_cache, args.split, args.pyc, profile,
+                       args.optimize, args.asynchronous)
+    else:
+        jobs_count = args.jobs or os.cpu_count() or 1
+        transpile_file(args.input, args.output, cache, args.dfa_cache, args.split, jobs_count, args.pyc, profile,
+                       args.optimize, args.asynchronous)
+        save_dfa_cache()
+        status = 0
+    if cache:
+        cache.evict()
+    if args.profile:
+        profile.report()
+    if args.profile_json:
+        profile.save(args.profile_json)
+    return status
 
 if __name__ == '__main__':
-    main(sys.argv)
+    sys.exit(main(sys.argv))
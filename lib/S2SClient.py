@@ -0,0 +1,99 @@
+"""a thin client of S2S --daemon. it imports neither antlr nor the transpiler, so it starts in milliseconds.
+
+    python3 lib/S2SClient.py input.pkg output.py
+    python3 lib/S2SClient.py input.pkg            # prints the code
+    python3 lib/S2SClient.py --stop
+
+with no daemon listening, the package is transpiled by S2S in a process of its own"""
+import os
+import sys
+import json
+import socket
+import argparse
+import tempfile
+import subprocess
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), f"s2s-{os.getuid()}.sock")
+S2S = os.path.join(os.path.dirname(os.path.abspath(__file__)), "S2S.py")
+
+class S2SClient:
+    """a connection to the daemon. it can be kept open for many requests"""
+
+    def __init__(self, socket_filename: str = DEFAULT_SOCKET):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.socket.connect(socket_filename)
+        except OSError:
+            self.socket.close()
+            raise
+        self.file = self.socket.makefile("rwb")
+
+    def request(self, request: dict) -> dict:
+        self.file.write(json.dumps(request).encode() + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("the daemon closed the connection")
+        return json.loads(line)
+
+    def transpile(self, input_filename: str, output_filename: str = None, split: bool = False,
+                  optimize: bool = True, asynchronous: bool = False) -> dict:
+        # the daemon doesn't run in our directory
+        request = {"input": os.path.abspath(input_filename), "split": split, "optimize": optimize,
+                   "async": asynchronous}
+        if output_filename:
+            request["output"] = os.path.abspath(output_filename)
+        return self.request(request)
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="S2SClient", description="transpiles with a running S2S --daemon")
+    parser.add_argument("input", nargs="?", help="the .pkg to transpile")
+    parser.add_argument("output", nargs="?", help="the .py to write. the code is printed without it")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help=f"the socket of the daemon. {DEFAULT_SOCKET} by default")
+    parser.add_argument("--split", action="store_true", help="parse the units of the script one by one")
+    parser.add_argument("--no-optimize", dest="optimize", action="store_false", help="keep every variable a Mutable")
+    parser.add_argument("--async", dest="asynchronous", action="store_true", help="generate coroutines")
+    parser.add_argument("--stop", action="store_true", help="shut the daemon down")
+    args = parser.parse_args(argv[1:])
+    if not args.stop and not args.input:
+        parser.error("the input is required")
+
+    try:
+        client = S2SClient(args.socket)
+    except OSError:
+        if args.stop:
+            return 0
+        # no daemon: same result, at the price of a cold start
+        command = [sys.executable, S2S, args.input, args.output or "/dev/stdout"]
+        if args.split:
+            command.append("--split")
+        if not args.optimize:
+            command.append("--no-optimize")
+        if args.asynchronous:
+            command.append("--async")
+        return subprocess.call(command)
+    with client:
+        if args.stop:
+            client.request({"command": "shutdown"})
+            return 0
+        response = client.transpile(args.input, args.output, args.split, args.optimize, args.asynchronous)
+    sys.stderr.write(response["messages"])
+    if not response["ok"]:
+        sys.stderr.write(response["error"])
+        return 1
+    if not args.output:
+        sys.stdout.write(response["code"])
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -3,9 +3,10 @@ import ast
 from typing import List
 from collections import deque
 from PLGLOBALS import PLGLOBALS
-from common import add_no_repeat, get_spec_classname_by_classname, ELSE, ELIF, SQL, SQL_VAR, TYPE
+from common import Scope, get_spec_classname_by_classname, ELSE, ELIF, SQL, SQL_VAR, TYPE
 from BaseVisitor import BaseVisitor, PKG_PLHELPER, PKG_PLCURSOR
 from SqlVisitor import SqlVisitor
+import emitter
 
 sys.path.append('./built')
 from PlSqlParser import PlSqlParser
@@ -28,20 +29,27 @@ TYPE_PLTABLE = "PLTABLE"
 TYPE_PLTABLE_OF = "PLTABLE_OF"
 TYPE_PLRECORD = "PLRECORD"
 PKG_PLGLOBALS = "PLGLOBALS"
+PKG_PLSESSION = "PLSESSION"
+TYPE_PLPACKAGE = "PLPACKAGE"
+PLGLOBALS_NAMES = frozenset(dir(PLGLOBALS))
 
 class ScriptVisitor(BaseVisitor):
 # pylint: disable=I0011,C0103
 
     def __init__(self):
         super().__init__()
-        self.pkgs_calls_found = []
-        self.vars_in_package = []
-        self.vars_declared = []
+        self.pkgs_calls_found = Scope()
+        self.vars_in_package = Scope()
+        self.vars_declared = Scope()
         self.pkg_name: str = None
 
     def visitSql_script(self, ctx: PlSqlParser.Sql_scriptContext):
         body = self.visitChildren(ctx)
-        add_no_repeat(self.pkgs_calls_found, [PKG_PLGLOBALS, PKG_PLHELPER, PKG_PLCURSOR])
+        return self.make_module(body)
+
+    def make_module(self, body):
+        """the body of every unit of the script, after the imports that all of them need"""
+        self.pkgs_calls_found.add([PKG_PLGLOBALS, PKG_PLHELPER, PKG_PLCURSOR])
         imports = self.create_imports()
         body = imports + body
         return ast.Module(
@@ -71,19 +79,21 @@ class ScriptVisitor(BaseVisitor):
         body = ret
         for item in body:
             if isinstance(item, ast.Assign):
-                add_no_repeat(self.vars_declared, item.targets[0].id)
+                self.vars_declared.add(item.targets[0].id)
         if not body:
             body.append(ast.Pass())
+        # the variables of the package are kept per session
+        self.pkgs_calls_found.add(PKG_PLSESSION)
         return ast.ClassDef(
             name=name,
             body=body,
             decorator_list=[],
-            bases=[]
+            bases=[ast.Name(id=TYPE_PLPACKAGE)]
         )
 
     def visitCreate_package_body(self, ctx: PlSqlParser.Create_package_bodyContext):
         self.pkg_name = name = ctx.package_name()[0].getText().upper()
-        add_no_repeat(self.vars_declared, name)
+        self.vars_declared.add(name)
         self.vars_in_package = self.vars_declared
         ret = self.visitChildren(ctx)
         spec_classname = get_spec_classname_by_classname(name)
@@ -108,11 +118,11 @@ class ScriptVisitor(BaseVisitor):
     def visitCreate_function_body(self, ctx: PlSqlParser.Create_function_bodyContext):
         visitor = ScriptVisitor()
         # FIXME: the function being processed should be added to vars_declared too, in case of recursivity
-        visitor.vars_declared = self.vars_declared.copy()
+        visitor.vars_declared = self.vars_declared.child()
         ret = visitor.visitChildren(ctx)
         ret = deque(ret)
         name = ret.popleft()
-        add_no_repeat(self.vars_declared, name.id)
+        self.vars_declared.add(name.id)
         args = []
         for expr in list(ret):
             if isinstance(expr, ast.arg):
@@ -163,8 +173,8 @@ class ScriptVisitor(BaseVisitor):
         visitor.pkg_name = self.pkg_name
         visitor.vars_in_package = self.vars_in_package
         ret = visitor.manual_visitProcedure_body(ctx)
-        add_no_repeat(self.vars_declared, ret.name)
-        add_no_repeat(self.pkgs_calls_found, visitor.pkgs_calls_found)
+        self.vars_declared.add(ret.name)
+        self.pkgs_calls_found.add(visitor.pkgs_calls_found)
         return ret
 
     def manual_visitProcedure_body(self, ctx: PlSqlParser.Procedure_bodyContext):
@@ -172,7 +182,7 @@ class ScriptVisitor(BaseVisitor):
             param.parameter_name().getText().upper()
             for param in ctx.parameter()
         ]
-        add_no_repeat(self.vars_declared, args_names)
+        self.vars_declared.add(args_names)
         ret = self.visitChildren(ctx)
         ret = deque(ret)
         name: ast.Name = ret.popleft()
@@ -309,20 +319,65 @@ class ScriptVisitor(BaseVisitor):
     def visitCursor_loop_param(self, ctx: PlSqlParser.Cursor_loop_paramContext):
         target = ctx.index_name().getText().upper()
         # declare the variable for being recognized by the children
-        add_no_repeat(self.vars_declared, target)
+        self.vars_declared.add(target)
         ret = self.visitChildren(ctx)
         target, lower, upper = ret
+        keywords = []
+        if ctx.REVERSE():
+            keywords.append(ast.keyword(arg="reverse", value=ast.NameConstant(value=True)))
         return ast.For(
             target=ast.Name(id=target),
             iter=ast.Call(
                 func=ast.Name(id="mrange"),
                 args=[lower, upper],
-                keywords=[]
+                keywords=keywords
             ),
             body=[],
             orelse=[]
         )
 
+    def visitForall_statement(self, ctx: PlSqlParser.Forall_statementContext):
+        bounds = ctx.bounds_clause()
+        dml = ctx.sql_statement().data_manipulation_language_statements()
+        if ctx.SAVE() or bounds.VALUES() or bounds.between_bound() or not dml:
+            raise NotImplementedError(f"unimplemented Forall_statement {ctx.getText()}")
+        index = ctx.index_name().getText().upper()
+        if bounds.INDICES():
+            # ie: TB.indices()
+            collection = self.wrap_local_variable(bounds.collection_name().getText().upper())
+            indexes = ast.Call(
+                func=ast.Attribute(value=collection, attr="indices"),
+                args=[],
+                keywords=[]
+            )
+        else:
+            lower, upper = self.visitChildren(bounds)
+            indexes = ast.Call(
+                func=ast.Name(id="mrange"),
+                args=[lower, upper],
+                keywords=[]
+            )
+        visitor = SqlVisitor()
+        visitor.vars_declared = self.vars_declared.child([index])
+        sql, binds = visitor.visitData_manipulation_language_statements(dml).args
+        # the binds of every index are executed at once, ie: PLCURSOR.FORALL(sql, lambda I: {...}, mrange(...))
+        return ast.Call(
+            func=ast.Attribute(
+                value=ast.Name(id=PKG_PLCURSOR),
+                attr="FORALL"
+            ),
+            args=[
+                sql,
+                ast.Lambda(
+                    args=ast.arguments(posonlyargs=[], args=[ast.arg(arg=index, annotation=None)], vararg=None,
+                                       kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[]),
+                    body=binds
+                ),
+                indexes
+            ],
+            keywords=[]
+        )
+
     def visitContinue_statement(self, ctx: PlSqlParser.Continue_statementContext):
         ret = self.visitChildren(ctx)
         condition = None if not ctx.condition() else ret[0]
@@ -486,7 +541,7 @@ class ScriptVisitor(BaseVisitor):
                 declared_vars.append(expr.targets[0].id)
             elif isinstance(expr, ast.FunctionDef):
                 declared_vars.append(expr.name)
-        add_no_repeat(self.vars_declared, declared_vars)
+        self.vars_declared.add(declared_vars)
         return ret
 
     def visitCursor_declaration(self, ctx: PlSqlParser.Cursor_declarationContext):
@@ -495,7 +550,7 @@ class ScriptVisitor(BaseVisitor):
             for param in ctx.parameter_spec()
         ]
         visitor = ScriptVisitor()
-        visitor.vars_declared = self.vars_declared + cursor_params
+        visitor.vars_declared = self.vars_declared.child(cursor_params)
         ret = visitor.visitChildren(ctx)
         ret = deque(ret)
         name: ast.Name = ret.popleft()
@@ -505,13 +560,21 @@ class ScriptVisitor(BaseVisitor):
             if isinstance(param, SQL):
                 sql = param
             elif isinstance(param, SQL_VAR):
-                sql_var = ast.Str(s=param.varname)
-                sql_vars.append(sql_var)
+                # the parameters of the cursor are bound by OPEN
+                if param.varname not in cursor_params:
+                    sql_vars.append(param)
             else:
                 continue
             ret.remove(param)
+        binds = ast.NameConstant(value=None)
+        if sql_vars:
+            # evaluated by OPEN, in the scope of the declaration
+            binds = ast.Lambda(
+                args=ast.arguments(posonlyargs=[], args=[], vararg=None, kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[]),
+                body=self.create_binds(sql_vars)
+            )
         cursor_params = [ast.Str(i) for i in cursor_params]
-        add_no_repeat(self.vars_declared, name.id)
+        self.vars_declared.add(name.id)
         return ast.Assign(
             targets=[name],
             value=ast.Call(
@@ -521,7 +584,7 @@ class ScriptVisitor(BaseVisitor):
                 ),
                 args=[
                     ast.Str(sql.sql),
-                    ast.List(elts=sql_vars),
+                    binds,
                     ast.List(elts=cursor_params)
                 ],
                 keywords=[]
@@ -550,12 +613,7 @@ class ScriptVisitor(BaseVisitor):
                 attr="OPEN"
             ),
             args=[
-                ast.List(elts=cursor_call_args),
-                ast.Call(
-                    func=ast.Name(id="locals"),
-                    args=[],
-                    keywords=[]
-                )
+                ast.List(elts=cursor_call_args)
             ],
             keywords=[]
         )
@@ -564,6 +622,19 @@ class ScriptVisitor(BaseVisitor):
         ret = self.visitChildren(ctx)
         ret = deque(ret)
         cursor = ret.popleft()
+        if ctx.BULK():
+            # the collections are filled at once, ie: CU().BULK_COLLECT(TB(), limit=m(100))
+            keywords = []
+            if ctx.LIMIT():
+                keywords.append(ast.keyword(arg="limit", value=ret.pop()))
+            return ast.Call(
+                func=ast.Attribute(
+                    value=cursor,
+                    attr="BULK_COLLECT"
+                ),
+                args=list(ret),
+                keywords=keywords
+            )
         destinations = ret
         return ast.Call(
             func=ast.Attribute(
@@ -595,7 +666,7 @@ class ScriptVisitor(BaseVisitor):
             args=[],
             keywords=[]
         )
-        add_no_repeat(self.vars_declared, name.id)
+        self.vars_declared.add(name.id)
         if ret and isinstance(ret[0], TYPE):
             the_type = ret.popleft().the_type
             value = ast.Call(
@@ -605,10 +676,39 @@ class ScriptVisitor(BaseVisitor):
             )
         if ret:
             value = ret.popleft()
-        return ast.Assign(
+            if not self.is_new_mutable(value):
+                # the value may be the Mutable of another variable, or a shared one, ie: x := y or b := x > 1
+                value = ast.Call(
+                    func=ast.Name(id="mcopy"),
+                    args=[value],
+                    keywords=[]
+                )
+        declaration = ast.Assign(
             targets=[name],
             value=value
         )
+        # the optimizer unboxes the locals of a native type
+        declaration.pl_type = self.native_type_name(ctx.type_spec())
+        return declaration
+
+    def is_new_mutable(self, value) -> bool:
+        """True for the expressions that make a Mutable of their own: a literal, m(NULL()) or an arithmetic operation"""
+        if isinstance(value, (ast.BinOp, ast.UnaryOp)):
+            return True
+        if not (isinstance(value, ast.Call) and isinstance(value.func, ast.Name) and value.func.id == "m"):
+            return False
+        return all(
+            emitter.is_constant(arg)
+            or isinstance(arg, ast.Call) and isinstance(arg.func, ast.Name) and arg.func.id == "NULL"
+            for arg in value.args
+        )
+
+    def native_type_name(self, ctx: PlSqlParser.Type_specContext):
+        """NUMBER, VARCHAR2, BOOLEAN... or None for a %TYPE, a %ROWTYPE or a user type"""
+        datatype = ctx.datatype() if ctx else None
+        if datatype is None or datatype.native_datatype_element() is None:
+            return None
+        return datatype.native_datatype_element().getText().upper()
 
     def visitReturn_statement(self, ctx: PlSqlParser.Return_statementContext):
         ret = self.visitChildren(ctx)
@@ -691,7 +791,7 @@ class ScriptVisitor(BaseVisitor):
         ret = deque(ret)
         type_name = ret.popleft()
         targets = [type_name]
-        add_no_repeat(self.vars_declared, type_name.id)
+        self.vars_declared.add(type_name.id)
         if ctx.table_type_def():
             value = ast.Name(id=TYPE_PLTABLE)
             if ret and isinstance(ret[0], TYPE):
@@ -702,14 +802,14 @@ class ScriptVisitor(BaseVisitor):
                     args=[the_type],
                     keywords=[]
                 )
-                add_no_repeat(self.pkgs_calls_found, TYPE_PLRECORD)
-            add_no_repeat(self.pkgs_calls_found, TYPE_PLTABLE)
+                self.pkgs_calls_found.add(TYPE_PLRECORD)
+            self.pkgs_calls_found.add(TYPE_PLTABLE)
             return ast.Assign(
                 targets=targets,
                 value=value
             )
         if ctx.record_type_def():
-            add_no_repeat(self.pkgs_calls_found, TYPE_PLRECORD)
+            self.pkgs_calls_found.add(TYPE_PLRECORD)
             return ast.Assign(
                 targets=targets,
                 value=ast.Name(id=TYPE_PLRECORD)
@@ -724,7 +824,7 @@ class ScriptVisitor(BaseVisitor):
         if ctx.PERCENT_TYPE():
             return None
         elif ctx.PERCENT_ROWTYPE():
-            add_no_repeat(self.pkgs_calls_found, TYPE_PLRECORD)
+            self.pkgs_calls_found.add(TYPE_PLRECORD)
             return TYPE(ast.Name(id=TYPE_PLRECORD))
         elif ctx.type_name():
             type_name = self.visitChildren(ctx)[0]
@@ -807,7 +907,7 @@ class ScriptVisitor(BaseVisitor):
         while True:
             if isinstance(name, str):
                 if name != self.pkg_name and name not in self.vars_declared:
-                    add_no_repeat(self.pkgs_calls_found, name)
+                    self.pkgs_calls_found.add(name)
                 break
             elif isinstance(name, ast.Call):
                 name = name.func
@@ -873,7 +973,7 @@ class ScriptVisitor(BaseVisitor):
                 value=ast.Name(id=self.pkg_name),
                 attr=value
             )
-        elif value in dir(PLGLOBALS):
+        elif value in PLGLOBALS_NAMES:
             value = ast.Attribute(
                 value=ast.Name(id=PKG_PLGLOBALS),
                 attr=value
@@ -883,6 +983,12 @@ class ScriptVisitor(BaseVisitor):
             value = ast.Name(id=value)
         return value
 
+    def bind_variable(self, name: str):
+        if self.pkg_name and self.vars_declared is self.vars_in_package and name in self.vars_in_package:
+            # a cursor of the package reads its binds in a lambda, that doesn't see the class body
+            return ast.Attribute(value=ast.Name(id=self.pkg_name), attr=name)
+        return self.wrap_local_variable(name)
+
     def visitRegular_id(self, ctx: PlSqlParser.Regular_idContext):
         if not ctx.REGULAR_ID():
             the_id = ctx.getText().upper()
@@ -16,7 +16,6 @@ class SqlVisitor(BaseVisitor):
         ret = self.visitSelect_statement(ctx)
         ret = deque(ret)
         sql: SQL = ret.popleft()
-        params = [ast.Str(s=param.varname) for param in ret]
         return ast.Call(
             func=ast.Attribute(
                 value=ast.Name(id=PKG_PLCURSOR),
@@ -24,12 +23,7 @@ class SqlVisitor(BaseVisitor):
             ),
             args=[
                 ast.Str(s=sql.sql),
-                ast.List(elts=params),
-                ast.Call(
-                    func=ast.Name(id="locals"),
-                    args=[],
-                    keywords=[]
-                )
+                self.create_binds(ret)
             ],
             keywords=[]
         )
@@ -50,28 +44,31 @@ class SqlVisitor(BaseVisitor):
             self,
             sql: SQL,
             possible_params: List[SQL_VAR],
-            locals_known: List[str]
+            locals_known: Scope
     ):
-        """replace in the sql, the declared variables for binds"""
-        unique_params = set(possible_params)
+        """replace in the sql, the declared variables for binds. returns one param per bind name"""
+        # a dict keeps the binds in order of appearance, so the generated code is reproducible
+        unique_params = {}
         offset = 0
         for param in possible_params:
             if param.varname in locals_known:
-                param_name_id = (".").join([param.varname] + param.attrs)
-                param_name_id = f':"{param_name_id}"'
+                bind_name = param.bind_name()
+                param_name_id = f':"{bind_name}"'
                 var_start = param.start_index + offset
                 var_stop = param.stop_index + offset + 1
                 sql.sql = sql.sql[:var_start] + param_name_id + sql.sql[var_stop:]
-                offset += 3
-            elif param in unique_params:
-                unique_params.remove(param)
-        params_found = list(unique_params)
+                # the source may be longer than the bind, ie: tbIds( j ) for :"TBIDS(J)"
+                offset += len(param_name_id) - (param.stop_index - param.start_index + 1)
+                unique_params.setdefault(bind_name, param)
+        params_found = list(unique_params.values())
         return sql, params_found
 
     def visitGeneral_element(self, ctx: PlSqlParser.General_elementContext):
         ret = self.visitChildren(ctx)
         if len(ret) <= 1:
             return ret
+        if ctx.general_element_part(0).function_argument():
+            return self.collectionElement(ctx, ret)
         if len(ret) > 2:
             # no idea what is this
             return None
@@ -80,6 +77,22 @@ class SqlVisitor(BaseVisitor):
         record.stop_index = field.stop_index
         return record
 
+    def collectionElement(self, ctx: PlSqlParser.General_elementContext, ret: List[SQL_VAR]):
+        """tb(i) or tb(i).id, indexed by a variable. the arguments of a function, ie: upper(sbname), are binds of their own"""
+        first, parts = ctx.general_element_part(0), ctx.general_element_part()[1:]
+        names = len(first.id_expression())
+        fields = [field.getText().upper() for part in parts for field in part.id_expression()]
+        collection, arguments = ret[0], ret[names:len(ret) - len(fields)]
+        argument_ctxs = first.function_argument().argument()
+        if names > 1 or collection.varname not in self.vars_declared or len(argument_ctxs) != 1:
+            return ret[names:]
+        if len(arguments) != 1 or argument_ctxs[0].getText().upper() != arguments[0].varname:
+            raise NotImplementedError(f"unsupported collection index {ctx.getText()}")
+        collection.index = arguments[0]
+        collection.attrs = fields
+        collection.stop_index = ctx.stop.stop
+        return collection
+
     def visitRegular_id(self, ctx: PlSqlParser.Regular_idContext):
         if not ctx.REGULAR_ID():
             the_id = ctx.getText().upper()
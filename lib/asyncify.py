@@ -0,0 +1,159 @@
+"""makes the generated code async, for S2S --async.
+
+the procedures and functions become coroutines, and what reaches the database is awaited: the
+calls to them, the OPEN, FETCH and BULK COLLECT of the cursors, and the statements run by
+PLCURSOR, that becomes PLCURSOR_ASYNC. the blocks of the script run in main(), a coroutine of its own,
+that the module runs with asyncio when it is run as a script, and that a service awaits instead.
+
+a script only sees its own packages. the call of a package of another one is awaited through
+awaited(), as it may be a procedure or the read of a variable"""
+import ast
+import emitter
+
+PKG_PLCURSOR = "PLCURSOR"
+PKG_PLCURSOR_ASYNC = "PLCURSOR_ASYNC"
+PKG_PLGLOBALS = "PLGLOBALS"
+MAIN = "main"
+AWAITED = "awaited"
+
+# the modules of runtime_libs that a script imports
+RUNTIME_MODULES = frozenset((
+    "DBMS_OUTPUT", "MOCKPLCURSOR", PKG_PLCURSOR, PKG_PLCURSOR_ASYNC, PKG_PLGLOBALS, "PLHELPER", "PLRECORD",
+    "PLSESSION", "PLTABLE",
+))
+# the coroutines of PLCURSOR_ASYNC
+PLCURSOR_CALLS = frozenset((
+    "SETUP", "FULL_EXECUTE", "FORALL", "AUTONOMOUS_TRANSACTION", "commit", "rollback", "getConn",
+    "getStatements", "startConnection", "closeLastConn",
+))
+# the coroutines of its cursors. CLOSE gives the driver cursor back to the statement cache, without a round trip
+CURSOR_CALLS = frozenset(("OPEN", "FETCH", "BULK_COLLECT"))
+# the functions of PLGLOBALS that query the database, in PLCURSOR_ASYNC
+PLGLOBALS_CALLS = frozenset(("SYS_CONTEXT",))
+FUNCTION_CALLS = frozenset(("execute_immediate_into",))
+
+def asyncify(module: ast.Module) -> ast.Module:
+    module = emitter.normalize(module)
+    transformer = _Asyncifier(module)
+    imports, definitions, script = [], [], []
+    for statement in module.body:
+        if isinstance(statement, (ast.Import, ast.ImportFrom)):
+            if statement.module == PKG_PLCURSOR:
+                statement.module = PKG_PLCURSOR_ASYNC
+            imports.append(statement)
+        elif isinstance(statement, ast.ClassDef) or _is_constant(statement):
+            definitions.append(transformer.visit(statement))
+        else:
+            script.append(statement)
+    body = imports + definitions
+    if script:
+        imports.insert(0, ast.Import(names=[ast.alias(name="asyncio", asname=None)]))
+        main = ast.FunctionDef(name=MAIN, args=_no_arguments(), body=script, decorator_list=[], returns=None)
+        body = imports + definitions + [transformer.visit(main), _run_main()]
+    module.body = body
+    return ast.fix_missing_locations(module)
+
+def _is_constant(statement) -> bool:
+    """a literal hoisted by the optimizer, ie: _k0 = Constant('OK')"""
+    return (isinstance(statement, ast.Assign) and isinstance(statement.value, ast.Call)
+            and isinstance(statement.value.func, ast.Name) and statement.value.func.id == "Constant")
+
+def _no_arguments() -> ast.arguments:
+    return ast.arguments(posonlyargs=[], args=[], vararg=None, kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[])
+
+def _run_main() -> ast.If:
+    """if __name__ == "__main__": asyncio.run(main())"""
+    return ast.If(
+        test=ast.Compare(
+            left=ast.Name(id="__name__", ctx=ast.Load()),
+            ops=[ast.Eq()],
+            comparators=[ast.Constant(value="__main__")]
+        ),
+        body=[ast.Expr(value=ast.Call(
+            func=ast.Attribute(value=ast.Name(id="asyncio", ctx=ast.Load()), attr="run", ctx=ast.Load()),
+            args=[ast.Call(func=ast.Name(id=MAIN, ctx=ast.Load()), args=[], keywords=[])],
+            keywords=[]
+        ))],
+        orelse=[]
+    )
+
+class _Asyncifier(ast.NodeTransformer):
+
+    def __init__(self, module: ast.Module):
+        # every procedure and function of the script, nested ones included
+        self.functions = {
+            node.name for node in ast.walk(module) if isinstance(node, ast.FunctionDef)
+        }
+        # the procedures and functions of each package, the body class inheriting from the spec one
+        classes = {node.name: node for node in module.body if isinstance(node, ast.ClassDef)}
+        self.packages = {name: self.methods(node, classes) for name, node in classes.items()}
+        self.external = {
+            node.module for node in module.body
+            if isinstance(node, ast.ImportFrom) and node.module not in RUNTIME_MODULES
+        } - self.packages.keys() - self.functions
+        self.in_coroutine = False
+        self.in_lambda = False
+
+    def methods(self, node: ast.ClassDef, classes: dict) -> set:
+        methods = {item.name for item in node.body if isinstance(item, ast.FunctionDef)}
+        for base in node.bases:
+            if isinstance(base, ast.Name) and base.id in classes:
+                methods |= self.methods(classes[base.id], classes)
+        return methods
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        in_coroutine, self.in_coroutine = self.in_coroutine, True
+        in_lambda, self.in_lambda = self.in_lambda, False
+        self.generic_visit(node)
+        self.in_coroutine, self.in_lambda = in_coroutine, in_lambda
+        coroutine = ast.AsyncFunctionDef(**{field: getattr(node, field, None) for field in node._fields})
+        return ast.copy_location(coroutine, node)
+
+    def visit_Lambda(self, node: ast.Lambda):
+        in_lambda, self.in_lambda = self.in_lambda, True
+        self.generic_visit(node)
+        self.in_lambda = in_lambda
+        return node
+
+    def visit_Name(self, node: ast.Name):
+        if node.id == PKG_PLCURSOR:
+            node.id = PKG_PLCURSOR_ASYNC
+        return node
+
+    def visit_Call(self, node: ast.Call):
+        func = node.func
+        if (isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id == PKG_PLGLOBALS
+                and func.attr in PLGLOBALS_CALLS):
+            func.value.id = PKG_PLCURSOR_ASYNC
+        self.generic_visit(node)
+        kind = self.kind(func)
+        if kind is None:
+            return node
+        if self.in_lambda or not self.in_coroutine:
+            raise NotImplementedError(f"{emitter.expr(node)} can't be awaited out of a procedure, ie: in a package spec")
+        if kind == AWAITED:
+            node = ast.Call(func=ast.Name(id=AWAITED, ctx=ast.Load()), args=[node], keywords=[])
+        return ast.Await(value=node)
+
+    def kind(self, func):
+        """await if the call is a coroutine, AWAITED if it may be one, None if it is not"""
+        if isinstance(func, ast.Name):
+            if func.id in self.functions or func.id in FUNCTION_CALLS:
+                return "await"
+            if func.id in self.external:
+                return AWAITED
+            return None
+        if not isinstance(func, ast.Attribute):
+            return None
+        owner = func.value
+        if isinstance(owner, ast.Name):
+            if owner.id == PKG_PLCURSOR_ASYNC:
+                return "await" if func.attr in PLCURSOR_CALLS | PLGLOBALS_CALLS else None
+            if owner.id in self.packages:
+                return "await" if func.attr in self.packages[owner.id] else None
+            if owner.id in self.external:
+                return AWAITED
+            if owner.id in RUNTIME_MODULES:
+                return None
+        # ie: PKG.CUDATA().OPEN([])
+        return "await" if func.attr in CURSOR_CALLS else None
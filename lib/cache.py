@@ -0,0 +1,113 @@
+import os
+import glob
+import pickle
+import hashlib
+import importlib.util
+from typing import Optional
+
+LIB_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+CACHE_EXTENSION = ".py"
+UNIT_EXTENSION = ".unit"
+
+_transpiler_version: str = None
+
+def transpiler_version() -> str:
+    """a digest of everything that shapes the generated code:
+    the transpiler itself, the generated parser and the runtime globals it resolves names against"""
+    global _transpiler_version
+    if _transpiler_version is not None:
+        return _transpiler_version
+    filenames = sorted(glob.glob(os.path.join(LIB_DIR, "*.py")))
+    for module in ("PlSqlParser", "PLGLOBALS"):
+        # located, not imported. importing the parser is what a cache hit saves
+        spec = importlib.util.find_spec(module)
+        if spec and spec.origin:
+            filenames.append(spec.origin)
+    digest = hashlib.sha256()
+    for filename in filenames:
+        with open(filename, "rb") as file:
+            digest.update(file.read())
+    _transpiler_version = digest.hexdigest()
+    return _transpiler_version
+
+class TranspileCache:
+    """on-disk cache of generated code, keyed by the hash of the .pkg and the transpiler version.
+    the least recently used entries are evicted once the cache grows over max_bytes"""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, source: bytes, options: str = "") -> str:
+        digest = hashlib.sha256()
+        digest.update(transpiler_version().encode())
+        digest.update(options.encode())
+        digest.update(source)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        filename = self._filename(key)
+        try:
+            with open(filename) as file:
+                code = file.read()
+            os.utime(filename) # a hit makes it the most recently used
+        except FileNotFoundError:
+            return None
+        return code
+
+    def put(self, key: str, code: str):
+        self._write(self._filename(key), code.encode())
+
+    def get_unit(self, key: str):
+        """the pickled result of a unit of a split script, or None"""
+        filename = self._filename(key, UNIT_EXTENSION)
+        try:
+            with open(filename, "rb") as file:
+                data = file.read()
+            os.utime(filename)
+        except FileNotFoundError:
+            return None
+        try:
+            return pickle.loads(data)
+        except (EOFError, pickle.UnpicklingError):
+            return None
+
+    def put_unit(self, key: str, value):
+        self._write(self._filename(key, UNIT_EXTENSION), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _write(self, filename: str, data: bytes):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        # write aside and rename, so a concurrent reader never sees half an entry
+        tmp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, "wb") as file:
+            file.write(data)
+        os.replace(tmp_filename, filename)
+
+    def evict(self):
+        entries = []
+        total = 0
+        filenames = []
+        for extension in (CACHE_EXTENSION, UNIT_EXTENSION):
+            filenames += glob.glob(os.path.join(self.directory, "*", "*" + extension))
+        for filename in filenames:
+            try:
+                stat = os.stat(filename)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, filename in entries:
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def _filename(self, key: str, extension: str = CACHE_EXTENSION) -> str:
+        return os.path.join(self.directory, key[:2], key + extension)
@@ -19,8 +19,16 @@ class SQL_VAR:
     def __init__(self):
         self.varname: str = None
         self.attrs: List[str] = []
+        # the variable indexing a collection, ie: I of TB(I).ID
+        self.index: SQL_VAR = None
         self.start_index: int = None
         self.stop_index: int = None
+    def bind_name(self) -> str:
+        """the name in the sql, ie: RC.ID or TB(I).ID"""
+        varname = self.varname
+        if self.index:
+            varname += f"({self.index.varname})"
+        return ".".join([varname] + self.attrs)
     def __hash__(self):
         return self.varname.__hash__()
     def __eq__(self, other):
@@ -29,24 +37,65 @@ class SQL_VAR:
 def get_spec_classname_by_classname(classname: str) -> str:
     return "_" + classname + "_spec"
 
-def full_flat_arr(arr):
-    return [elem for elem in find_elems(arr)]
-
-def find_elems(arr):
+def flat_extend(flat: list, arr):
+    """appends the elements of arr to flat, flattening the nested lists and dropping the None.
+    iterative, and linear in the number of elements"""
     if arr is None:
         return
     if not isinstance(arr, list):
-        yield arr
+        flat.append(arr)
         return
-    for elem in arr:
-        yield from find_elems(elem)
-
-def add_no_repeat(a_list: list, items):
-    if not isinstance(items, list):
-        items = [items]
-    for item in items:
-        if not item in a_list:
-            a_list.append(item)
+    stack = [iter(arr)]
+    while stack:
+        for elem in stack[-1]:
+            if isinstance(elem, list):
+                stack.append(iter(elem))
+                break
+            if elem is not None:
+                flat.append(elem)
+        else:
+            stack.pop()
+
+class Scope:
+    """names, in the order they were declared. a lookup goes up to the parent scopes, in O(1) each.
+    a child scope shares its parents instead of copying them, and what it declares doesn't leak to them"""
+
+    def __init__(self, names=(), parent: "Scope" = None):
+        self.parent = parent
+        self.names = dict.fromkeys(names)
+
+    def child(self, names=()) -> "Scope":
+        return Scope(names, self)
+
+    def add(self, items):
+        if isinstance(items, str):
+            items = [items]
+        for item in items:
+            if item not in self:
+                self.names[item] = None
+
+    def __contains__(self, name) -> bool:
+        scope = self
+        while scope is not None:
+            if name in scope.names:
+                return True
+            scope = scope.parent
+        return False
+
+    def __iter__(self):
+        chain = []
+        scope = self
+        while scope is not None:
+            chain.append(scope)
+            scope = scope.parent
+        for scope in reversed(chain):
+            yield from scope.names
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Scope({list(self)})"
 
 def get_original_text(ctx: antlr4.ParserRuleContext) -> str:
     return ctx.start.getInputStream().getText(ctx.start.start, ctx.stop.stop)
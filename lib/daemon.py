@@ -0,0 +1,104 @@
+"""the transport of S2S --daemon: one JSON request per line, one JSON response per line.
+
+    {"input": "/abs/path/x.pkg", "output": "/abs/path/x.py", "split": false, "optimize": true, "async": false}
+    {"ok": true, "cached": false, "ll_fallback": false, "messages": ""}
+
+without "output" the response carries the generated "code". a failure answers
+{"ok": false, "error": <traceback>, "messages": ...}. the commands {"command": "ping"}
+and {"command": "shutdown"} are answered by the transport itself"""
+import io
+import os
+import sys
+import json
+import socket
+import threading
+import traceback
+import contextlib
+import socketserver
+from typing import Callable, TextIO
+
+Handler = Callable[[dict], dict]
+
+class _Service:
+    """one request at a time: the parser, its DFA and the visitor state are process wide"""
+
+    def __init__(self, handle: Handler):
+        self.handle = handle
+        self.lock = threading.Lock()
+        self.stopping = False
+
+    def respond(self, line: str) -> dict:
+        messages = io.StringIO()
+        try:
+            request = json.loads(line)
+            command = request.get("command")
+            if command == "ping":
+                response = {"pid": os.getpid()}
+            elif command == "shutdown":
+                self.stopping = True
+                response = {}
+            elif command is not None:
+                raise ValueError(f"unknown command {command}")
+            else:
+                # the parser errors go to stderr, and the stdio protocol owns stdout
+                with self.lock, contextlib.redirect_stdout(messages), contextlib.redirect_stderr(messages):
+                    response = self.handle(request)
+            response["ok"] = True
+        except Exception: # pylint: disable=I0011,W0703
+            response = {"ok": False, "error": traceback.format_exc()}
+        response["messages"] = messages.getvalue()
+        return response
+
+def serve_stdio(handle: Handler, stdin: TextIO = None, stdout: TextIO = None):
+    """serves until stdin is closed or a shutdown command"""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    service = _Service(handle)
+    for line in stdin:
+        if not line.strip():
+            continue
+        stdout.write(json.dumps(service.respond(line)) + "\n")
+        stdout.flush()
+        if service.stopping:
+            break
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        service: _Service = self.server.service
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = service.respond(line.decode())
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+            if service.stopping:
+                # shutdown() waits for serve_forever, which runs in another thread
+                threading.Thread(target=self.server.shutdown).start()
+                break
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve_socket(handle: Handler, socket_filename: str):
+    """serves on a unix socket until a shutdown command. a client can keep its connection for many requests"""
+    if os.path.exists(socket_filename):
+        if is_listening(socket_filename):
+            raise RuntimeError(f"a daemon is already listening on {socket_filename}")
+        os.remove(socket_filename) # left by a daemon that was killed
+    server = _Server(socket_filename, _RequestHandler)
+    server.service = _Service(handle)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(socket_filename)
+
+def is_listening(socket_filename: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_filename)
+        except OSError:
+            return False
+    return True
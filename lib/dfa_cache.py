@@ -0,0 +1,138 @@
+import os
+import sys
+import pickle
+import hashlib
+import antlr4
+from antlr4.atn.ATN import ATN
+from antlr4.atn.ATNState import ATNState
+from antlr4.atn.ATNSimulator import ATNSimulator
+from antlr4.atn.LexerATNSimulator import LexerATNSimulator
+from antlr4.atn.SemanticContext import SemanticContext
+from antlr4.PredictionContext import PredictionContext
+
+sys.path.append('./built')
+from PlSqlLexer import PlSqlLexer
+from PlSqlParser import PlSqlParser
+
+# the prediction DFA can be as deep as the longest prediction context
+PICKLE_RECURSION_LIMIT = 20000
+
+# objects that the runtime compares by identity. they must come back as themselves
+_SINGLETONS = {
+    "parser_error": ATNSimulator.ERROR,
+    "lexer_error": LexerATNSimulator.ERROR,
+    "empty_context": PredictionContext.EMPTY,
+    "no_semantic_context": SemanticContext.NONE,
+}
+_RECOGNIZERS = {
+    "lexer": PlSqlLexer,
+    "parser": PlSqlParser,
+}
+
+def dfa_key() -> str:
+    """the DFA is only valid for the ATN it was built from, and for the runtime that pickled it"""
+    digest = hashlib.sha256()
+    digest.update(sys.version.encode())
+    digest.update(os.path.dirname(antlr4.__file__).encode())
+    for recognizer in _RECOGNIZERS.values():
+        digest.update(sys.modules[recognizer.__module__].serializedATN().encode())
+    return digest.hexdigest()
+
+def count_dfa_states() -> int:
+    return sum(
+        len(dfa.states)
+        for recognizer in _RECOGNIZERS.values()
+        for dfa in recognizer.decisionsToDFA
+    )
+
+class _DfaPickler(pickle.Pickler):
+    """ATN states and the ATN are stored as references. they are rebuilt when the parser module is imported"""
+
+    def persistent_id(self, obj): # pylint: disable=I0011,E0202
+        if isinstance(obj, ATNState):
+            return ("state", _recognizer_name(obj.atn), obj.stateNumber)
+        if isinstance(obj, ATN):
+            return ("atn", _recognizer_name(obj))
+        for name, singleton in _SINGLETONS.items():
+            if obj is singleton:
+                return ("singleton", name)
+        return None
+
+class _DfaUnpickler(pickle.Unpickler):
+
+    def persistent_load(self, pid): # pylint: disable=I0011,E0202
+        kind, *args = pid
+        if kind == "state":
+            recognizer, state_number = args
+            states = _RECOGNIZERS[recognizer].atn.states
+            if not 0 <= state_number < len(states):
+                # pickled from another grammar
+                raise pickle.UnpicklingError(f"unknown ATN state {state_number}")
+            return states[state_number]
+        if kind == "atn":
+            return _RECOGNIZERS[args[0]].atn
+        if kind == "singleton":
+            return _SINGLETONS[args[0]]
+        raise pickle.UnpicklingError(f"unknown persistent id {pid}")
+
+def _recognizer_name(atn: ATN) -> str:
+    for name, recognizer in _RECOGNIZERS.items():
+        if recognizer.atn is atn:
+            return name
+    raise pickle.PicklingError("the DFA references a foreign ATN")
+
+class DfaCache:
+    """persists the lexer and parser prediction DFA, so a new process starts with a warm parser"""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.states_loaded = 0
+
+    def load(self) -> bool:
+        try:
+            with open(self.filename, "rb") as file, recursion_limit(PICKLE_RECURSION_LIMIT):
+                # the key comes first, the DFA of another ATN is never unpickled
+                unpickler = _DfaUnpickler(file)
+                if unpickler.load() != dfa_key():
+                    return False
+                dfas = unpickler.load()
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return False
+        for name, recognizer in _RECOGNIZERS.items():
+            recognizer.decisionsToDFA[:] = dfas[name]
+        self.states_loaded = count_dfa_states()
+        return True
+
+    def save(self) -> bool:
+        """only writes when this process has learnt something new"""
+        if count_dfa_states() <= self.states_loaded:
+            return False
+        dfas = {
+            name: recognizer.decisionsToDFA
+            for name, recognizer in _RECOGNIZERS.items()
+        }
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_filename = f"{self.filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, "wb") as file, recursion_limit(PICKLE_RECURSION_LIMIT):
+            pickler = _DfaPickler(file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickler.dump(dfa_key())
+            pickler.dump(dfas)
+        os.replace(tmp_filename, self.filename)
+        self.states_loaded = count_dfa_states()
+        return True
+
+class recursion_limit:
+    # pylint: disable=I0011,C0103
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(self.previous, self.limit))
+
+    def __exit__(self, *exc):
+        sys.setrecursionlimit(self.previous)
@@ -0,0 +1,519 @@
+"""writes the source of the trees built by the visitors, straight to a file.
+
+it knows the nodes the visitors build, and the liberties they take: a deque for a body,
+a Name as the id of a Name, an Expr around a statement, a BinOp with a comparison operator.
+any other node is handed to astor. the same trees can be compiled to a .pyc, without the source"""
+import io
+import os
+import sys
+import ast
+import math
+import time
+import marshal
+import importlib.util
+from collections import deque
+from contextlib import contextmanager
+from typing import TextIO
+
+INDENT = "    "
+
+_OR, _AND, _NOT, _CMP, _BITOR, _BITXOR, _BITAND, _SHIFT, _ARITH, _TERM, _FACTOR, _POWER, _AWAIT, _ATOM = range(1, 15)
+
+_BINOPS = {
+    ast.Add: ("+", _ARITH),
+    ast.Sub: ("-", _ARITH),
+    ast.Mult: ("*", _TERM),
+    ast.Div: ("/", _TERM),
+    ast.FloorDiv: ("//", _TERM),
+    ast.Mod: ("%", _TERM),
+    ast.Pow: ("**", _POWER),
+    ast.LShift: ("<<", _SHIFT),
+    ast.RShift: (">>", _SHIFT),
+    ast.BitOr: ("|", _BITOR),
+    ast.BitXor: ("^", _BITXOR),
+    ast.BitAnd: ("&", _BITAND),
+}
+_CMPOPS = {
+    ast.Eq: "==",
+    ast.NotEq: "!=",
+    ast.Lt: "<",
+    ast.LtE: "<=",
+    ast.Gt: ">",
+    ast.GtE: ">=",
+    ast.Is: "is",
+    ast.IsNot: "is not",
+    ast.In: "in",
+    ast.NotIn: "not in",
+}
+_UNARYOPS = {
+    ast.Not: ("not ", _NOT),
+    ast.USub: ("-", _FACTOR),
+    ast.UAdd: ("+", _FACTOR),
+    ast.Invert: ("~", _FACTOR),
+}
+_BOOLOPS = {
+    ast.Or: ("or", _OR),
+    ast.And: ("and", _AND),
+}
+
+def to_source(node: ast.AST) -> str:
+    output = io.StringIO()
+    write_source(node, output)
+    return output.getvalue()
+
+def write_source(node: ast.AST, output: TextIO):
+    SourceEmitter(output).statements(_as_list(node.body) if isinstance(node, ast.Module) else [node])
+
+class SourceEmitter:
+    """statements are written line by line as they are visited. only the text of one expression is held at a time"""
+
+    def __init__(self, output: TextIO):
+        self.output = output
+        self.level = 0
+        self.lines_written = 0
+        self.blank_lines_pending = 0
+
+    def statements(self, nodes):
+        previous = None
+        for node in nodes:
+            node = _unwrap_statement(node)
+            # the blank lines of pep8 around the classes and the functions
+            if _is_definition(node) or _is_definition(previous):
+                self.blank_lines(1 if self.level else 2)
+            self.statement(node)
+            previous = node
+
+    def statement(self, node):
+        method = getattr(self, "stmt_" + type(node).__name__, None)
+        if method is None:
+            self.fallback_statement(node)
+        else:
+            method(node)
+
+    def line(self, text: str):
+        if self.lines_written:
+            self.output.write("\n" * self.blank_lines_pending)
+        self.blank_lines_pending = 0
+        self.output.write(INDENT * self.level + text + "\n")
+        self.lines_written += 1
+
+    def blank_lines(self, count: int):
+        self.blank_lines_pending = max(self.blank_lines_pending, count)
+
+    def block(self, header: str, body):
+        self.line(header + ":")
+        self.level += 1
+        body = _as_list(body)
+        self.blank_lines_pending = 0
+        self.statements(body or [ast.Pass()])
+        self.level -= 1
+
+    def fallback_statement(self, node):
+        import astor
+        try:
+            source = astor.to_source(node)
+        except Exception as error:
+            raise NotImplementedError(f"can't write {ast.dump(node)}") from error
+        for line in source.rstrip("\n").split("\n"):
+            self.line(line)
+
+    # statements
+
+    def stmt_ImportFrom(self, node: ast.ImportFrom):
+        names = ", ".join(_alias(alias) for alias in node.names)
+        self.line(f"from {'.' * (node.level or 0)}{node.module or ''} import {names}")
+
+    def stmt_Import(self, node: ast.Import):
+        self.line("import " + ", ".join(_alias(alias) for alias in node.names))
+
+    def stmt_ClassDef(self, node: ast.ClassDef):
+        self.decorators(node)
+        bases = [expr(base) for base in _as_list(node.bases)]
+        bases += [_keyword(keyword) for keyword in _as_list(getattr(node, "keywords", []))]
+        header = f"class {node.name}({', '.join(bases)})" if bases else f"class {node.name}"
+        self.block(header, node.body)
+
+    def stmt_FunctionDef(self, node: ast.FunctionDef, keyword: str = "def"):
+        self.decorators(node)
+        header = f"{keyword} {node.name}({_arguments(node.args)})"
+        if getattr(node, "returns", None) is not None:
+            header += " -> " + expr(node.returns)
+        self.block(header, node.body)
+
+    def stmt_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
+        self.stmt_FunctionDef(node, "async def")
+
+    def decorators(self, node):
+        for decorator in _as_list(node.decorator_list):
+            self.line("@" + expr(decorator))
+
+    def stmt_Assign(self, node: ast.Assign):
+        targets = " = ".join(expr(target) for target in _as_list(node.targets))
+        self.line(f"{targets} = {expr(node.value)}")
+
+    def stmt_AugAssign(self, node: ast.AugAssign):
+        self.line(f"{expr(node.target)} {_BINOPS[type(node.op)][0]}= {expr(node.value)}")
+
+    def stmt_Expr(self, node: ast.Expr):
+        self.line(expr(node.value))
+
+    def stmt_If(self, node: ast.If, keyword: str = "if"):
+        self.block(f"{keyword} {expr(node.test)}", node.body)
+        orelse = _as_list(node.orelse)
+        if len(orelse) == 1 and isinstance(_unwrap_statement(orelse[0]), ast.If):
+            self.stmt_If(_unwrap_statement(orelse[0]), "elif")
+        elif orelse:
+            self.block("else", orelse)
+
+    def stmt_While(self, node: ast.While):
+        self.block(f"while {expr(node.test)}", node.body)
+        if _as_list(node.orelse):
+            self.block("else", node.orelse)
+
+    def stmt_For(self, node: ast.For):
+        self.block(f"for {expr(node.target)} in {expr(node.iter)}", node.body)
+        if _as_list(node.orelse):
+            self.block("else", node.orelse)
+
+    def stmt_Try(self, node: ast.Try):
+        self.block("try", node.body)
+        for handler in _as_list(node.handlers):
+            header = "except"
+            if handler.type is not None:
+                header += " " + expr(handler.type)
+            if handler.name:
+                header += " as " + _identifier(handler.name)
+            self.block(header, handler.body)
+        if _as_list(node.orelse):
+            self.block("else", node.orelse)
+        if _as_list(node.finalbody):
+            self.block("finally", node.finalbody)
+
+    def stmt_Raise(self, node: ast.Raise):
+        if node.exc is None:
+            self.line("raise")
+        elif getattr(node, "cause", None) is not None:
+            self.line(f"raise {expr(node.exc)} from {expr(node.cause)}")
+        else:
+            self.line("raise " + expr(node.exc))
+
+    def stmt_Return(self, node: ast.Return):
+        self.line("return" if node.value is None else "return " + expr(node.value))
+
+    def stmt_Pass(self, _):
+        self.line("pass")
+
+    def stmt_Break(self, _):
+        self.line("break")
+
+    def stmt_Continue(self, _):
+        self.line("continue")
+
+    def stmt_Global(self, node: ast.Global):
+        self.line("global " + ", ".join(node.names))
+
+def expr(node, precedence: int = 0) -> str:
+    """the source of an expression, in parentheses if it binds looser than precedence"""
+    method = _EXPRESSIONS.get(type(node))
+    if method is None:
+        return _fallback_expr(node)
+    text, own_precedence = method(node)
+    if own_precedence < precedence:
+        return f"({text})"
+    return text
+
+def _fallback_expr(node) -> str:
+    import astor
+    try:
+        source = astor.to_source(node).strip()
+    except Exception as error:
+        raise NotImplementedError(f"can't write {ast.dump(node)}") from error
+    return f"({source})"
+
+def _name(node: ast.Name):
+    return _identifier(node.id), _ATOM
+
+def _attribute(node: ast.Attribute):
+    value = expr(node.value, _ATOM)
+    if isinstance(constant_value(node.value), int):
+        value = f"({value})" # 1.real would be a float
+    return f"{value}.{_identifier(node.attr)}", _ATOM
+
+def _call(node: ast.Call):
+    args = [expr(arg) for arg in _as_list(node.args)]
+    args += [_keyword(keyword) for keyword in _as_list(node.keywords or [])]
+    return f"{expr(node.func, _ATOM)}({', '.join(args)})", _ATOM
+
+def _constant(node):
+    value = constant_value(node)
+    if isinstance(value, str):
+        return _string(value), _ATOM
+    if isinstance(value, float) and math.isnan(value):
+        return "float('nan')", _ATOM
+    if isinstance(value, float) and math.isinf(value):
+        return ("1e309", _ATOM) if value > 0 else ("-1e309", _FACTOR)
+    text = repr(value)
+    if text.startswith("-"):
+        return text, _FACTOR
+    return text, _ATOM
+
+def _binop(node: ast.BinOp):
+    if type(node.op) in _CMPOPS:
+        # the visitors build some comparisons as a BinOp. the source is the same
+        return _comparison(node.left, [node.op], [node.right])
+    symbol, precedence = _BINOPS[type(node.op)]
+    if isinstance(node.op, ast.Pow):
+        left, right = expr(node.left, precedence + 1), expr(node.right, precedence)
+    else:
+        left, right = expr(node.left, precedence), expr(node.right, precedence + 1)
+    return f"{left} {symbol} {right}", precedence
+
+def _compare(node: ast.Compare):
+    return _comparison(node.left, node.ops, node.comparators)
+
+def _comparison(left, ops, comparators):
+    text = expr(left, _CMP + 1)
+    for op, comparator in zip(_as_list(ops), _as_list(comparators)):
+        text += f" {_CMPOPS[type(op)]} {expr(comparator, _CMP + 1)}"
+    return text, _CMP
+
+def _boolop(node: ast.BoolOp):
+    symbol, precedence = _BOOLOPS[type(node.op)]
+    values = [expr(value, precedence + 1) for value in _as_list(node.values)]
+    return f" {symbol} ".join(values), precedence
+
+def _unaryop(node: ast.UnaryOp):
+    symbol, precedence = _UNARYOPS[type(node.op)]
+    return symbol + expr(node.operand, precedence), precedence
+
+def _lambda(node: ast.Lambda):
+    arguments = _arguments(node.args)
+    header = f"lambda {arguments}" if arguments else "lambda"
+    return f"{header}: {expr(node.body)}", 0
+
+def _await(node: ast.Await):
+    return "await " + expr(node.value, _ATOM), _AWAIT
+
+def _list(node: ast.List):
+    return "[" + ", ".join(expr(elt) for elt in _as_list(node.elts)) + "]", _ATOM
+
+def _tuple(node: ast.Tuple):
+    elts = [expr(elt) for elt in _as_list(node.elts)]
+    if len(elts) == 1:
+        return f"({elts[0]},)", _ATOM
+    return "(" + ", ".join(elts) + ")", _ATOM
+
+def _dict(node: ast.Dict):
+    items = []
+    for key, value in zip(_as_list(node.keys), _as_list(node.values)):
+        if key is None:
+            items.append("**" + expr(value, _ATOM))
+        else:
+            items.append(f"{expr(key)}: {expr(value)}")
+    return "{" + ", ".join(items) + "}", _ATOM
+
+def _subscript(node: ast.Subscript):
+    index = node.slice
+    if type(index).__name__ == "Index":
+        index = index.value # python < 3.9
+    return f"{expr(node.value, _ATOM)}[{expr(index)}]", _ATOM
+
+_EXPRESSIONS = {
+    ast.Name: _name,
+    ast.Attribute: _attribute,
+    ast.Call: _call,
+    ast.Constant: _constant,
+    ast.BinOp: _binop,
+    ast.Compare: _compare,
+    ast.BoolOp: _boolop,
+    ast.UnaryOp: _unaryop,
+    ast.Lambda: _lambda,
+    ast.Await: _await,
+    ast.List: _list,
+    ast.Tuple: _tuple,
+    ast.Dict: _dict,
+    ast.Subscript: _subscript,
+}
+# python < 3.8 builds these instead of ast.Constant, with the value in another field
+_LEGACY_CONSTANTS = {"Str": "s", "Bytes": "s", "Num": "n", "NameConstant": "value"}
+if sys.version_info < (3, 8):
+    for _legacy in _LEGACY_CONSTANTS:
+        _EXPRESSIONS[getattr(ast, _legacy)] = _constant
+
+def is_constant(node) -> bool:
+    """a literal, on every version of python"""
+    return isinstance(node, ast.Constant) or (
+        sys.version_info < (3, 8) and type(node).__name__ in _LEGACY_CONSTANTS)
+
+def constant_value(node):
+    if isinstance(node, ast.Constant):
+        return node.value
+    field = _LEGACY_CONSTANTS.get(type(node).__name__)
+    if field and sys.version_info < (3, 8):
+        return getattr(node, field)
+    return None
+
+def _string(value: str) -> str:
+    """multiline strings, the sql mostly, keep their lines"""
+    if "\n" not in value or not value.replace("\n", "").isprintable():
+        return repr(value)
+    body = value.replace("\\", "\\\\").replace('"""', '\\"""')
+    if body.endswith('"'):
+        body = body[:-1] + '\\"'
+    return '"""' + body + '"""'
+
+def _identifier(value) -> str:
+    # the visitors sometimes build a Name whose id is a Name
+    while isinstance(value, ast.Name):
+        value = value.id
+    if isinstance(value, ast.AST):
+        return expr(value)
+    return value
+
+def _alias(alias: ast.alias) -> str:
+    if alias.asname:
+        return f"{alias.name} as {alias.asname}"
+    return alias.name
+
+def _keyword(keyword: ast.keyword) -> str:
+    if keyword.arg is None:
+        return "**" + expr(keyword.value, _ATOM)
+    return f"{keyword.arg}={expr(keyword.value)}"
+
+def _arguments(node: ast.arguments) -> str:
+    positional = _as_list(getattr(node, "posonlyargs", [])) + _as_list(node.args)
+    defaults = _as_list(node.defaults)
+    first_default = len(positional) - len(defaults)
+    texts = []
+    for i, arg in enumerate(positional):
+        text = _arg(arg)
+        if i >= first_default:
+            text += "=" + expr(defaults[i - first_default])
+        texts.append(text)
+        if i + 1 == len(_as_list(getattr(node, "posonlyargs", []))):
+            texts.append("/")
+    kwonlyargs = _as_list(getattr(node, "kwonlyargs", []))
+    if getattr(node, "vararg", None):
+        texts.append("*" + _arg(node.vararg))
+    elif kwonlyargs:
+        texts.append("*")
+    kw_defaults = _as_list(getattr(node, "kw_defaults", [])) or [None] * len(kwonlyargs)
+    for arg, default in zip(kwonlyargs, kw_defaults):
+        texts.append(_arg(arg) if default is None else f"{_arg(arg)}={expr(default)}")
+    if getattr(node, "kwarg", None):
+        texts.append("**" + _arg(node.kwarg))
+    return ", ".join(texts)
+
+def _arg(node: ast.arg) -> str:
+    text = _identifier(node.arg)
+    if getattr(node, "annotation", None) is not None:
+        text += ": " + expr(node.annotation)
+    return text
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return list(value)
+
+def _unwrap_statement(node):
+    # ScriptVisitor.visitUnit_statement wraps statements in an Expr
+    if isinstance(node, ast.Expr) and isinstance(node.value, ast.stmt):
+        return node.value
+    return node
+
+def _is_definition(node) -> bool:
+    return isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+
+# .pyc
+
+_LIST_FIELDS = {
+    "body", "orelse", "finalbody", "handlers", "decorator_list", "bases", "keywords", "targets", "names",
+    "elts", "keys", "values", "ops", "comparators", "defaults", "kw_defaults", "kwonlyargs", "posonlyargs",
+    "type_ignores",
+}
+
+class _Normalizer(ast.NodeTransformer):
+    """makes the tree of the visitors acceptable for compile()"""
+
+    def generic_visit(self, node):
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, deque):
+                value = list(value)
+            elif value is None and not hasattr(node, field):
+                is_list = field in _LIST_FIELDS or (field == "args" and isinstance(node, (ast.Call, ast.arguments)))
+                value = [] if is_list else None
+            if field in ("id", "attr", "arg") and isinstance(value, ast.AST):
+                value = _identifier(value)
+            if field == "ctx" and value is None:
+                value = ast.Load()
+            setattr(node, field, value)
+        return super().generic_visit(node)
+
+    def visit_Assign(self, node: ast.Assign):
+        node = self.generic_visit(node)
+        for target in node.targets:
+            _store(target)
+        return node
+
+    def visit_AugAssign(self, node: ast.AugAssign):
+        node = self.generic_visit(node)
+        _store(node.target)
+        return node
+
+    def visit_For(self, node: ast.For):
+        node = self.generic_visit(node)
+        _store(node.target)
+        return node
+
+    def visit_Expr(self, node: ast.Expr):
+        node = self.generic_visit(node)
+        if isinstance(node.value, ast.stmt):
+            return node.value
+        return node
+
+    def visit_BinOp(self, node: ast.BinOp):
+        node = self.generic_visit(node)
+        if type(node.op) in _CMPOPS:
+            return ast.Compare(left=node.left, ops=[node.op], comparators=[node.right])
+        return node
+
+def _store(target):
+    target.ctx = ast.Store()
+    if isinstance(target, (ast.Tuple, ast.List)):
+        for elt in target.elts:
+            _store(elt)
+
+def normalize(module: ast.Module) -> ast.Module:
+    module = _Normalizer().visit(module)
+    return ast.fix_missing_locations(module)
+
+@contextmanager
+def open_output(output_filename: str, mode: str = "w"):
+    """the file is written aside, and renamed once whole. a failure leaves no half written file,
+    that make would take for an up to date one"""
+    tmp_filename = f"{output_filename}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_filename, mode) as output:
+            yield output
+        os.replace(tmp_filename, output_filename)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+def write_pyc(module: ast.Module, output_filename: str, filename: str = None):
+    """compiles the tree in place, and writes a sourceless .pyc that python can run or import"""
+    code = compile(normalize(module), filename or output_filename, "exec")
+    write_code(code, output_filename)
+
+def write_code(code, output_filename: str):
+    data = bytearray(importlib.util.MAGIC_NUMBER)
+    if sys.version_info >= (3, 7):
+        data += (0).to_bytes(4, "little") # the flags of pep 552: a timestamp based pyc
+    data += int(time.time()).to_bytes(4, "little")
+    data += (0).to_bytes(4, "little") # the size of the source, that there isn't
+    data += marshal.dumps(code)
+    with open_output(output_filename, "wb") as output:
+        output.write(data)
@@ -0,0 +1,446 @@
+"""unboxes the locals that nothing but their own code can see.
+
+a variable of the generated code is a Mutable, so that it can be passed as an OUT parameter,
+fetched into or bound to the SQL of a cursor. a local declared with a native type and a value, that is none
+of those, and that is only assigned expressions of its own type, holds a plain int, str or bool instead:
+`X <<= X() + m(1)` becomes `X = X + 1`. so does the index of a numeric FOR loop, that PL/SQL only lets
+be read: the loop iterates a native range instead of the Mutables of mrange.
+
+such a local can't be NULL, so the NULL semantics hold. where it meets a Mutable it is boxed again with
+m(), so the comparisons keep the coercions of Mutable.__eq__.
+
+the literals left, m(1), that are only read in a function or a loop, are built once instead of every
+time they are run: they become module level Constants, that refuse to be assigned"""
+import ast
+import emitter
+
+INT = "int"
+STR = "str"
+BOOL = "bool"
+
+TYPE_KINDS = {
+    **dict.fromkeys((
+        "NUMBER", "INTEGER", "INT", "SMALLINT", "DEC", "DECIMAL", "NUMERIC", "PLS_INTEGER", "BINARY_INTEGER",
+        "SIMPLE_INTEGER", "NATURAL", "NATURALN", "POSITIVE", "POSITIVEN", "SIGNTYPE",
+    ), INT),
+    **dict.fromkeys(("VARCHAR2", "VARCHAR", "NVARCHAR2", "CHAR", "NCHAR", "STRING"), STR),
+    "BOOLEAN": BOOL,
+}
+CONSTANT_KINDS = {int: INT, str: STR, bool: BOOL}
+
+# the helpers that only read the value of their arguments: they keep none, and return new values
+READ_ONLY_CALLS = frozenset((
+    "CONCAT", "ISNULL", "NOT", "mcopy", "mrange", "DBMS_OUTPUT.PUT_LINE",
+    "PLGLOBALS.CHR", "PLGLOBALS.INSTR", "PLGLOBALS.LENGTH", "PLGLOBALS.LOWER", "PLGLOBALS.MOD",
+    "PLGLOBALS.SUBSTR", "PLGLOBALS.TO_CHAR", "PLGLOBALS.TO_NUMBER", "PLGLOBALS.TRIM", "PLGLOBALS.LTRIM",
+    "PLGLOBALS.RTRIM", "PLGLOBALS.LPAD", "PLGLOBALS.RPAD", "PLGLOBALS.UPPER",
+))
+INT_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Mod)
+BOOL_COMPARISONS = (ast.Eq, ast.NotEq)
+
+def optimize(module: ast.Module) -> ast.Module:
+    module = emitter.normalize(module)
+    _Unboxer().scope(module.body)
+    _Hoister().run(module)
+    return module
+
+def _dotted_name(node) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        value = _dotted_name(node.value)
+        return value and f"{value}.{node.attr}"
+    return None
+
+def _is_call_of(node, name: str) -> bool:
+    return isinstance(node, ast.Call) and _dotted_name(node.func) == name
+
+def _is_read(node) -> bool:
+    """X(), the way the code reads a variable"""
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.args and not node.keywords
+
+def _is_definition(node) -> bool:
+    return isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda))
+
+class _Analysis:
+    """finds the locals of one scope that can be unboxed, and their kinds"""
+
+    def __init__(self):
+        self.declarations = {}
+        self.assignments = {}
+        self.escaped = set()
+        self.loops = set()
+        self.indexes = set()
+
+    def run(self, body) -> dict:
+        for node in _scope_nodes(body):
+            if _is_index_loop(node):
+                self.loops.add(node)
+                self.indexes.add(node.target.id)
+        for statement in body:
+            if not (isinstance(statement, ast.Assign) and len(statement.targets) == 1
+                    and isinstance(statement.targets[0], ast.Name)):
+                continue
+            name = statement.targets[0].id
+            if name in self.declarations:
+                # declared twice, ie: by two blocks of a script
+                self.escaped.add(name)
+            elif TYPE_KINDS.get(getattr(statement, "pl_type", None)):
+                self.declarations[name] = statement
+        if not self.declarations and not self.indexes:
+            return {}
+        # a loop reusing the name of a variable
+        self.escaped.update(self.indexes.intersection(self.declarations))
+        for statement in body:
+            self.walk(statement, [])
+        kinds = {
+            name: TYPE_KINDS[declaration.pl_type] for name, declaration in self.declarations.items()
+            if name not in self.escaped
+        }
+        kinds.update((name, INT) for name in self.indexes if name not in self.escaped)
+        # an assignment of another candidate only fits while that one is unboxed too
+        changed = True
+        while changed:
+            changed = False
+            for name in [name for name in kinds if name in self.declarations]:
+                values = [self.declarations[name].value] + self.assignments.get(name, [])
+                if any(_kind(value, kinds) != kinds[name] for value in values):
+                    del kinds[name]
+                    changed = True
+        return kinds
+
+    def walk(self, node, parents: list):
+        if _is_definition(node):
+            # whatever a nested function or class uses of the scope, it uses as a Mutable
+            self.escaped.update(self.names_in(node))
+            return
+        if isinstance(node, (ast.Global, ast.Nonlocal)):
+            self.escaped.update(node.names)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            self.escaped.add(node.name)
+        elif isinstance(node, ast.Name) and node.id in self.indexes:
+            self.index_occurrence(node, parents)
+        elif isinstance(node, ast.Name) and node.id in self.declarations:
+            self.occurrence(node, parents)
+        parents.append(node)
+        for child in ast.iter_child_nodes(node):
+            self.walk(child, parents)
+        parents.pop()
+
+    def names_in(self, node):
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name):
+                yield child.id
+            elif isinstance(child, ast.arg):
+                yield child.arg
+            elif isinstance(child, (ast.Global, ast.Nonlocal)):
+                yield from child.names
+
+    def occurrence(self, node: ast.Name, parents: list):
+        parent = parents[-1] if parents else None
+        if isinstance(parent, ast.Assign) and parent is self.declarations[node.id]:
+            return
+        if isinstance(parent, ast.AugAssign) and parent.target is node and isinstance(parent.op, ast.LShift):
+            self.assignments.setdefault(node.id, []).append(parent.value)
+            return
+        if _is_read(parent) and parent.func is node and _is_copied(parent, parents[:-1]):
+            return
+        # a bare name is fetched into, or passed to be assigned. X() passes the Mutable itself
+        self.escaped.add(node.id)
+
+    def index_occurrence(self, node: ast.Name, parents: list):
+        parent = parents[-1] if parents else None
+        if parent in self.loops and parent.target is node:
+            return
+        # mrange makes a new Mutable for every value, and PL/SQL can't assign the index.
+        # so it can be boxed again wherever it is used, even if it is passed as a parameter
+        if _is_read(parent) and parent.func is node:
+            return
+        self.escaped.add(node.id)
+
+def _scope_nodes(body):
+    """the nodes of the statements, but those of the nested functions and classes"""
+    pending = list(body)
+    while pending:
+        node = pending.pop()
+        if _is_definition(node):
+            continue
+        yield node
+        pending.extend(ast.iter_child_nodes(node))
+
+def _is_index_loop(node) -> bool:
+    return isinstance(node, ast.For) and isinstance(node.target, ast.Name) and _is_call_of(node.iter, "mrange")
+
+def _is_copied(node, parents: list, returned: bool = True) -> bool:
+    """True if what is done with the value of node never keeps the Mutable itself.
+    returned tells if a return counts: a local dies with its function, a shared constant doesn't"""
+    parent = parents[-1] if parents else None
+    if isinstance(parent, (ast.BinOp, ast.UnaryOp, ast.Compare, ast.Expr)):
+        return True
+    if isinstance(parent, ast.Return):
+        return returned
+    if isinstance(parent, ast.AugAssign):
+        # <<= copies the value
+        return parent.value is node
+    if isinstance(parent, (ast.If, ast.While)):
+        return parent.test is node
+    if isinstance(parent, ast.Call):
+        return _dotted_name(parent.func) in READ_ONLY_CALLS and any(arg is node for arg in parent.args)
+    if isinstance(parent, ast.BoolOp):
+        # and/or evaluate to one of their operands
+        return _is_copied(parent, parents[:-1], returned)
+    if isinstance(parent, ast.Dict):
+        # the binds of a statement are read as it runs. those of a cursor are in a lambda, that they escape to
+        return (any(value is node for value in parent.values) and len(parents) > 1
+                and _is_call_of(parents[-2], "PLCURSOR.FULL_EXECUTE"))
+    return False
+
+def _kind(node, kinds: dict) -> str:
+    """the kind of the plain value of an expression, or None if it has to stay a Mutable"""
+    if isinstance(node, ast.Call):
+        if _is_read(node):
+            return kinds.get(node.func.id)
+        if _is_call_of(node, "m") and len(node.args) == 1 and not node.keywords:
+            argument = node.args[0]
+            if emitter.is_constant(argument):
+                return CONSTANT_KINDS.get(type(emitter.constant_value(argument)))
+            return _kind(argument, kinds)
+        if _is_call_of(node, "mcopy") and len(node.args) == 1:
+            return _kind(node.args[0], kinds)
+        if _is_call_of(node, "CONCAT") and len(node.args) == 2:
+            return STR if all(_kind(arg, kinds) for arg in node.args) else None
+        if _is_call_of(node, "NOT") and len(node.args) == 1:
+            return BOOL if _kind(node.args[0], kinds) == BOOL else None
+    elif isinstance(node, ast.BinOp):
+        if isinstance(node.op, INT_OPERATORS) and _kind(node.left, kinds) == INT == _kind(node.right, kinds):
+            return INT
+    elif isinstance(node, ast.UnaryOp):
+        if isinstance(node.op, ast.USub) and _kind(node.operand, kinds) == INT:
+            return INT
+    elif isinstance(node, ast.Compare):
+        if len(node.ops) == 1:
+            left, right = _kind(node.left, kinds), _kind(node.comparators[0], kinds)
+            if left and left == right and (left != BOOL or isinstance(node.ops[0], BOOL_COMPARISONS)):
+                return BOOL
+    elif isinstance(node, ast.BoolOp):
+        if all(_kind(value, kinds) == BOOL for value in node.values):
+            return BOOL
+    return None
+
+class _Unboxer:
+    """rewrites a scope, and the scopes nested in it, once the unboxed locals of each are known"""
+
+    def __init__(self):
+        self.kinds = {}
+
+    def scope(self, body):
+        outer = self.kinds
+        self.kinds = _Analysis().run(body)
+        for i, statement in enumerate(body):
+            body[i] = self.statement(statement)
+        self.kinds = outer
+
+    def statement(self, node):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self.expressions(node, ("decorator_list", "args", "returns"))
+            self.scope(node.body)
+            return node
+        if isinstance(node, ast.ClassDef):
+            outer, self.kinds = self.kinds, {}
+            self.expressions(node, ("bases", "keywords", "decorator_list"))
+            node.body = [self.statement(statement) for statement in node.body]
+            self.kinds = outer
+            return node
+        if isinstance(node, ast.Assign) and self.is_unboxed(node.targets[0]):
+            # the declaration
+            node.value = self.plain(node.value)
+            return node
+        if isinstance(node, ast.AugAssign) and isinstance(node.op, ast.LShift):
+            if self.is_unboxed(node.target):
+                return ast.copy_location(ast.Assign(targets=[node.target], value=self.plain(node.value)), node)
+            # the index of an element or of a field of a record, ie: TB[I()] <<= ...
+            node.target = self.boxed(node.target)
+            node.value = self.loose(node.value)
+            return node
+        if isinstance(node, ast.For) and self.is_unboxed(node.target):
+            # irange takes Mutables or plain values
+            node.iter = ast.Call(func=ast.Name(id="irange", ctx=ast.Load()), args=[self.plain(arg) for arg in node.iter.args],
+                                 keywords=node.iter.keywords)
+            self.blocks(node)
+            return node
+        if isinstance(node, (ast.If, ast.While)):
+            node.test = self.loose(node.test)
+            self.blocks(node)
+            return node
+        if isinstance(node, ast.Expr):
+            node.value = self.loose(node.value)
+            return node
+        self.expressions(node, [field for field, value in ast.iter_fields(node)
+                                if field != "handlers" and not _is_statements(value)])
+        self.blocks(node)
+        return node
+
+    def blocks(self, node):
+        for field, value in ast.iter_fields(node):
+            if _is_statements(value):
+                setattr(node, field, [self.statement(statement) for statement in value])
+            elif field == "handlers":
+                for handler in value:
+                    handler.type = handler.type and self.boxed(handler.type)
+                    handler.body = [self.statement(statement) for statement in handler.body]
+
+    def expressions(self, node, fields):
+        """boxes the expressions of the fields"""
+        for field in fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                setattr(node, field, [self.boxed(item) if isinstance(item, ast.expr) else self.child(item) for item in value])
+            elif isinstance(value, ast.expr):
+                setattr(node, field, self.boxed(value))
+            elif isinstance(value, ast.AST):
+                self.child(value)
+
+    def child(self, node):
+        """a keyword, the arguments of a function... anything with expressions inside"""
+        if isinstance(node, ast.AST):
+            self.expressions(node, node._fields)
+        return node
+
+    def is_unboxed(self, target) -> bool:
+        return isinstance(target, ast.Name) and target.id in self.kinds
+
+    def plain(self, node):
+        return self.expression(node)[0]
+
+    def loose(self, node):
+        """where a plain value does as well as a Mutable: a test, or what is assigned with <<="""
+        new, kind = self.expression(node)
+        if kind and not self.mentions_unboxed(node):
+            return node
+        return new
+
+    def boxed(self, node):
+        new, kind = self.expression(node)
+        if kind is None:
+            return new
+        if not self.mentions_unboxed(node):
+            # only literals. the original is left as it was
+            return node
+        return _mutable(new)
+
+    def mentions_unboxed(self, node) -> bool:
+        return any(_is_read(child) and child.func.id in self.kinds for child in ast.walk(node))
+
+    def expression(self, node):
+        """returns the rewritten node, and the kind of its plain value. None if it is still a Mutable.
+        the nodes of a plain expression are new: node is left untouched, unless the kind is None"""
+        kind = _kind(node, self.kinds)
+        if kind is None:
+            # a parse error leaves None where the expression was
+            if node is not None:
+                self.expressions(node, node._fields)
+            return node, None
+        if isinstance(node, ast.Call):
+            if _is_read(node):
+                return ast.Name(id=node.func.id, ctx=ast.Load()), kind
+            if _is_call_of(node, "m"):
+                argument = node.args[0]
+                if emitter.is_constant(argument):
+                    return ast.Constant(value=emitter.constant_value(argument)), kind
+                return self.expression(argument)
+            if _is_call_of(node, "mcopy"):
+                # a plain value is a copy already
+                return self.expression(node.args[0])
+            if _is_call_of(node, "CONCAT"):
+                # CONCAT is str(v1) + str(v2)
+                left, right = (self.string(arg) for arg in node.args)
+                return ast.BinOp(left=left, op=ast.Add(), right=right), kind
+            # NOT
+            return ast.UnaryOp(op=ast.Not(), operand=self.plain(node.args[0])), kind
+        if isinstance(node, ast.BinOp):
+            return ast.BinOp(left=self.plain(node.left), op=node.op, right=self.plain(node.right)), kind
+        if isinstance(node, ast.UnaryOp):
+            return ast.UnaryOp(op=node.op, operand=self.plain(node.operand)), kind
+        if isinstance(node, ast.Compare):
+            return ast.Compare(left=self.plain(node.left), ops=node.ops, comparators=[self.plain(node.comparators[0])]), kind
+        return ast.BoolOp(op=node.op, values=[self.plain(value) for value in node.values]), kind
+
+    def string(self, node):
+        new, kind = self.expression(node)
+        if kind == STR:
+            return new
+        return ast.Call(func=ast.Name(id="str", ctx=ast.Load()), args=[new], keywords=[])
+
+def _mutable(node):
+    return ast.Call(func=ast.Name(id="m", ctx=ast.Load()), args=[node], keywords=[])
+
+def _is_statements(value) -> bool:
+    return isinstance(value, list) and bool(value) and isinstance(value[0], ast.stmt)
+
+class _Hoister:
+    """replaces the literals read in functions and loops with module level Constants, one per value"""
+
+    def __init__(self):
+        self.constants = {}
+
+    def run(self, module: ast.Module):
+        self.visit(module, [], False)
+        if not self.constants:
+            return
+        definitions = [
+            ast.Assign(targets=[ast.Name(id=name, ctx=ast.Store())],
+                       value=ast.Call(func=ast.Name(id="Constant", ctx=ast.Load()), args=[value], keywords=[]))
+            for name, value in self.constants.values()
+        ]
+        # after the imports, that bring Constant in
+        position = 0
+        while position < len(module.body) and isinstance(module.body[position], (ast.Import, ast.ImportFrom)):
+            position += 1
+        module.body[position:position] = definitions
+
+    def visit(self, node, parents: list, hot: bool):
+        """hot is True inside a function or a loop, where the code may run many times"""
+        hot = hot or isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.While, ast.For))
+        parents.append(node)
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, list):
+                for i, item in enumerate(value):
+                    value[i] = self.child(item, parents, hot)
+            elif isinstance(value, ast.AST):
+                setattr(node, field, self.child(value, parents, hot))
+        parents.pop()
+
+    def child(self, node, parents: list, hot: bool):
+        if hot and isinstance(node, ast.expr):
+            literal = _literal(node)
+            if literal and _is_copied(node, parents, returned=False):
+                return ast.Name(id=self.constant(*literal), ctx=ast.Load())
+        if isinstance(node, ast.AST):
+            self.visit(node, parents, hot)
+        return node
+
+    def constant(self, key, value) -> str:
+        if key not in self.constants:
+            # lower case: the names of the PL/SQL code are upper case
+            self.constants[key] = (f"_k{len(self.constants)}", value)
+        return self.constants[key][0]
+
+def _literal(node):
+    """the (key, value) of m(1), -m(1) or m(NULL()), or None"""
+    negative = isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub)
+    if negative:
+        node = node.operand
+    if not (_is_call_of(node, "m") and len(node.args) == 1 and not node.keywords):
+        return None
+    argument = node.args[0]
+    if emitter.is_constant(argument) and type(emitter.constant_value(argument)) in (int, float, str, bool):
+        value = emitter.constant_value(argument)
+        if negative:
+            if type(value) not in (int, float):
+                return None
+            value = -value
+        # 1, 1.0 and True are equal, but not the same literal
+        return (type(value), value), ast.Constant(value=value)
+    if _is_call_of(argument, "NULL") and not argument.args and not negative:
+        return ("NULL",), ast.Call(func=ast.Name(id="NULL", ctx=ast.Load()), args=[], keywords=[])
+    return None
@@ -0,0 +1,45 @@
+import sys
+import antlr4
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.ErrorListener import ConsoleErrorListener
+from antlr4.error.Errors import ParseCancellationException
+
+from profiling import NULL_PROFILE
+
+sys.path.append('./built')
+
+# how many times SLL prediction failed and the input had to be parsed again with full LL
+ll_fallbacks = 0
+
+def parse(input_stream: antlr4.InputStream, profile=NULL_PROFILE):
+    """two-stage parsing: the fast SLL prediction bails out at the first error,
+    and only then the input is parsed again with full LL, which reports the errors if they are real"""
+    global ll_fallbacks
+    # the generated parser takes seconds to import. a cache hit never gets here
+    with profile.phase("import"):
+        from PlSqlLexer import PlSqlLexer
+        from PlSqlParser import PlSqlParser
+    lexer = PlSqlLexer(input_stream)
+    stream = antlr4.CommonTokenStream(lexer)
+    if profile.enabled:
+        # otherwise the lexer runs whenever the parser needs a token, and its time counts as parsing
+        with profile.phase("lex"):
+            stream.fill()
+    parser = PlSqlParser(stream)
+    profile.instrument_parser(parser)
+    parser._interp.predictionMode = PredictionMode.SLL
+    parser._errHandler = BailErrorStrategy()
+    parser.removeErrorListeners()
+    try:
+        with profile.phase("parse (SLL)"):
+            return parser.sql_script()
+    except ParseCancellationException:
+        pass
+    ll_fallbacks += 1
+    parser._errHandler = DefaultErrorStrategy()
+    parser.reset()
+    parser.addErrorListener(ConsoleErrorListener.INSTANCE)
+    parser._interp.predictionMode = PredictionMode.LL
+    with profile.phase("parse (LL)"):
+        return parser.sql_script()
@@ -0,0 +1,187 @@
+"""where the time of a transpilation goes: per phase, per parser rule and per visitor method.
+
+the times are wall times, and include the overhead of measuring them. total is the time
+from the call to the return, self leaves out the time of the nested calls of the same kind"""
+import sys
+import json
+import time
+import inspect
+import contextlib
+from typing import TextIO
+
+SECTIONS = ("phases", "rules", "visitors", "files")
+
+class Timing:
+    __slots__ = ("calls", "total", "self")
+
+    def __init__(self, calls: int = 0, total: float = 0.0, self_time: float = 0.0):
+        self.calls = calls
+        self.total = total
+        self.self = self_time
+
+class _Stack:
+    """the calls in progress of one kind. a call's time is discounted from its caller's self time"""
+
+    def __init__(self, timings: dict):
+        self.timings = timings
+        self.frames = []
+
+    def push(self, name: str):
+        self.frames.append([name, time.perf_counter(), 0.0])
+
+    def pop(self):
+        name, start, nested = self.frames.pop()
+        elapsed = time.perf_counter() - start
+        timing = self.timings.get(name)
+        if timing is None:
+            timing = self.timings[name] = Timing()
+        timing.calls += 1
+        timing.total += elapsed
+        timing.self += elapsed - nested
+        if self.frames:
+            self.frames[-1][2] += elapsed
+
+class Profile:
+    """with detailed False, only the phases are timed, without the overhead of hooking every rule and method"""
+    enabled = True
+
+    def __init__(self, detailed: bool = True):
+        self.detailed = detailed
+        self.sections = {section: {} for section in SECTIONS}
+        self._phases = _Stack(self.sections["phases"])
+        self._rules = _Stack(self.sections["rules"])
+        self._visitors = _Stack(self.sections["visitors"])
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        self._phases.push(name)
+        try:
+            yield
+        finally:
+            self._phases.pop()
+
+    def add_file(self, filename: str, seconds: float):
+        self.sections["files"][filename] = Timing(1, seconds, seconds)
+
+    def instrument_parser(self, parser):
+        """times every rule, through the hooks the generated parser calls on entry and exit"""
+        if not self.detailed:
+            return
+        rules = self._rules
+        rule_names = parser.ruleNames
+        enter_rule, exit_rule = parser.enterRule, parser.exitRule
+        enter_recursion_rule, unroll_recursion_contexts = parser.enterRecursionRule, parser.unrollRecursionContexts
+
+        def enterRule(localctx, state, ruleIndex):
+            rules.push(rule_names[ruleIndex])
+            enter_rule(localctx, state, ruleIndex)
+
+        def exitRule():
+            exit_rule()
+            rules.pop()
+
+        def enterRecursionRule(localctx, state, ruleIndex, precedence):
+            rules.push(rule_names[ruleIndex])
+            enter_recursion_rule(localctx, state, ruleIndex, precedence)
+
+        def unrollRecursionContexts(parentCtx):
+            unroll_recursion_contexts(parentCtx)
+            rules.pop()
+
+        # the generated rules call them through self, so the instance attributes win
+        parser.enterRule = enterRule
+        parser.exitRule = exitRule
+        parser.enterRecursionRule = enterRecursionRule
+        parser.unrollRecursionContexts = unrollRecursionContexts
+
+    @contextlib.contextmanager
+    def visitors(self, *classes):
+        """times the methods defined in the visitor classes, while in the block"""
+        originals = []
+        for cls in classes if self.detailed else ():
+            for name, method in list(vars(cls).items()):
+                if not inspect.isfunction(method) or name.startswith("__"):
+                    continue
+                originals.append((cls, name, method))
+                setattr(cls, name, self._timed(method, f"{cls.__name__}.{name}"))
+        try:
+            yield
+        finally:
+            for cls, name, method in originals:
+                setattr(cls, name, method)
+
+    def _timed(self, method, name: str):
+        visitors = self._visitors
+
+        def timed(*args, **kwargs):
+            visitors.push(name)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                visitors.pop()
+        return timed
+
+    def to_dict(self) -> dict:
+        return {
+            section: {
+                name: {"calls": timing.calls, "total": timing.total, "self": timing.self}
+                for name, timing in timings.items()
+            }
+            for section, timings in self.sections.items()
+        }
+
+    def merge(self, data: dict):
+        """adds the timings of another profile, ie: the one of a batch worker"""
+        for section, timings in data.items():
+            for name, values in timings.items():
+                timing = self.sections[section].get(name)
+                if timing is None:
+                    timing = self.sections[section][name] = Timing()
+                timing.calls += values["calls"]
+                timing.total += values["total"]
+                timing.self += values["self"]
+
+    def save(self, filename: str):
+        with open(filename, "w") as file:
+            json.dump(self.to_dict(), file, indent=2, sort_keys=True)
+
+    def report(self, output: TextIO = None, limit: int = 20):
+        """the slowest entries of each section, by self time"""
+        output = output or sys.stderr
+        for section in SECTIONS:
+            timings = self.sections[section]
+            if not timings:
+                continue
+            output.write(f"\n{section:48} {'calls':>10} {'total s':>10} {'self s':>10}\n")
+            ranking = sorted(timings.items(), key=lambda item: item[1].self, reverse=True)
+            for name, timing in ranking[:limit]:
+                output.write(f"{name[:48]:48} {timing.calls:10} {timing.total:10.3f} {timing.self:10.3f}\n")
+            if len(ranking) > limit:
+                output.write(f"... {len(ranking) - limit} more\n")
+
+class NullProfile:
+    """what is used when not profiling. it costs nothing"""
+    enabled = False
+
+    def phase(self, _):
+        return _NULL_CONTEXT
+
+    def visitors(self, *_):
+        return _NULL_CONTEXT
+
+    def instrument_parser(self, _):
+        pass
+
+    def add_file(self, *_):
+        pass
+
+class _NullContext:
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_CONTEXT = _NullContext()
+NULL_PROFILE = NullProfile()
@@ -0,0 +1,131 @@
+"""a script split in its units, the way SQL*Plus runs it: a line with a lone / ends a unit.
+
+each unit is parsed on its own, so only one parse tree is alive at a time, and the units can be parsed
+in a pool. they are still visited in order by a single visitor: a package body needs what its spec declared"""
+import re
+import io
+import ast
+import pickle
+import hashlib
+import multiprocessing
+from typing import List, Tuple
+import antlr4
+from antlr4.error.Errors import RecognitionException
+
+from AntlrCaseInsensitiveFileInputStream import AntlrCaseInsensitiveInputStream
+from cache import TranspileCache
+from dfa_cache import recursion_limit, PICKLE_RECURSION_LIMIT
+import parsing
+from profiling import NULL_PROFILE
+
+UNIT_SEPARATOR = re.compile(r"^[ \t]*/[ \t]*\r?$", re.MULTILINE)
+# the cache entry that tells a unit was transpiled before, whatever came before it
+SEEN_OPTION = "seen"
+
+def split_units(text: str) -> List[Tuple[int, str]]:
+    """returns the line where each unit starts, and its text. blank units are skipped"""
+    units = []
+    line = start = 0
+    for separator in UNIT_SEPARATOR.finditer(text):
+        unit = text[start:separator.start()]
+        if unit.strip():
+            units.append((line, unit))
+        line += unit.count("\n") + text.count("\n", separator.start(), separator.end())
+        start = separator.end()
+    unit = text[start:]
+    if unit.strip():
+        units.append((line, unit))
+    return units
+
+def unit_stream(line: int, unit: str) -> AntlrCaseInsensitiveInputStream:
+    # padded with the lines before it, so the parser errors point to the line in the script
+    return AntlrCaseInsensitiveInputStream("\n" * line + unit)
+
+class _TreePickler(pickle.Pickler):
+    """the tree is pickled without the parser, the lexer or the input.
+    the tokens keep their offsets, and are bound to a new stream of the same text when loaded.
+    the errors the parser recovered from were already reported, and are dropped"""
+
+    def persistent_id(self, obj): # pylint: disable=I0011,E0202
+        if isinstance(obj, (antlr4.Parser, antlr4.Lexer, RecognitionException)):
+            return "recognizer"
+        if isinstance(obj, antlr4.InputStream):
+            return "input"
+        return None
+
+class _TreeUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, input_stream: antlr4.InputStream):
+        super().__init__(file)
+        self.input_stream = input_stream
+
+    def persistent_load(self, pid): # pylint: disable=I0011,E0202
+        if pid == "recognizer":
+            return None
+        if pid == "input":
+            return self.input_stream
+        raise pickle.UnpicklingError(f"unknown persistent id {pid}")
+
+def parse_unit(unit: Tuple[int, str]) -> Tuple[bytes, int]:
+    """runs inside a pool worker. returns the pickled tree, and how many times the parser fell back to LL"""
+    fallbacks_before = parsing.ll_fallbacks
+    tree = parsing.parse(unit_stream(*unit))
+    data = io.BytesIO()
+    with recursion_limit(PICKLE_RECURSION_LIMIT):
+        _TreePickler(data, protocol=pickle.HIGHEST_PROTOCOL).dump(tree)
+    return data.getvalue(), parsing.ll_fallbacks - fallbacks_before
+
+def load_unit(data: bytes, unit: Tuple[int, str]):
+    with recursion_limit(PICKLE_RECURSION_LIMIT):
+        return _TreeUnpickler(io.BytesIO(data), unit_stream(*unit)).load()
+
+def state_digest(visitor) -> str:
+    return hashlib.sha256(pickle.dumps(visitor.get_state(), protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+def transpile_units(text: str, jobs_count: int = 1, cache: TranspileCache = None, profile=NULL_PROFILE) -> ast.Module:
+    """the generated code is the same as the one of the whole script parsed at once.
+    with a cache, a unit is only parsed again if its text or what the units before it declared changed"""
+    with profile.phase("import"):
+        from ScriptVisitor import ScriptVisitor
+        from SqlVisitor import SqlVisitor
+        from BaseVisitor import BaseVisitor
+    units = split_units(text)
+    visitor = ScriptVisitor()
+    pool = None
+    parsing_units = {}
+    if jobs_count > 1 and len(units) > 1:
+        pool = multiprocessing.Pool(processes=min(jobs_count, len(units)))
+        for i, unit in enumerate(units):
+            # a unit that was seen before is most likely a cache hit. it is parsed only if it's not
+            if cache and cache.get_unit(cache.key(unit[1].encode(), SEEN_OPTION)):
+                continue
+            parsing_units[i] = pool.apply_async(parse_unit, (unit,))
+    body = []
+    try:
+        for i, unit in enumerate(units):
+            if cache:
+                key = cache.key(unit[1].encode(), state_digest(visitor))
+                cached = cache.get_unit(key)
+                if cached is not None:
+                    unit_body, state = cached
+                    visitor.set_state(state)
+                    body += unit_body
+                    continue
+            if i in parsing_units:
+                data, fallbacks = parsing_units.pop(i).get()
+                parsing.ll_fallbacks += fallbacks
+                tree = load_unit(data, unit)
+            else:
+                tree = parsing.parse(unit_stream(*unit), profile)
+            with profile.phase("visit"), profile.visitors(ScriptVisitor, SqlVisitor, BaseVisitor):
+                unit_body = visitor.visitChildren(tree) or []
+            del tree
+            if cache:
+                cache.put_unit(key, (unit_body, visitor.get_state()))
+                cache.put_unit(cache.key(unit[1].encode(), SEEN_OPTION), True)
+            body += unit_body
+    finally:
+        if pool:
+            pool.terminate()
+    with profile.phase("visit"):
+        return visitor.make_module(body)
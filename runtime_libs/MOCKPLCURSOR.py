@@ -3,9 +3,9 @@ from typing import List, Dict, Deque
 from collections import deque
 import ast
 import re
-import cx_Oracle
 from PLHELPER import extract_value, PleaseNotMutable
 from PLCURSOR import PLCURSOR
+from PLCURSOR_ASYNC import PLCURSOR_ASYNC
 
 class MOCKPLCURSOR:
 # pylint: disable=I0011,C0103
@@ -16,6 +16,7 @@ class MOCKPLCURSOR:
             self.datasource: Deque[List] = None
             self.cursor = None
             self.rowcount = None
+            self.description = None
             _sqls_mocked[sql] = self
 
         def RETURNS(self, datasource):
@@ -25,6 +26,14 @@ class MOCKPLCURSOR:
         def ROWCOUNT(self, rowcount):
             self.rowcount = rowcount.value
 
+        def COLUMNS(self, columns):
+            """the names of the columns returned, ie: '["ID", "NAME"]'"""
+            self.description = [(name,) for name in ast.literal_eval(columns.value)]
+
+        def EXPECT_HAVEBEENEXECUTEDMANYWITH(self, str_rows):
+            rows = ast.literal_eval(str_rows.value)
+            self.cursor.executemany.assert_called_with(mock.ANY, rows)
+
         def EXPECT_HAVEBEENOPENWITH(self, str_params):
             params = ast.literal_eval(str_params.value)
             self.cursor.execute.assert_called_with(mock.ANY, params)
@@ -45,11 +54,32 @@ class MOCKPLCURSOR:
     def EXPECT_IN_NORMAL_TRANSACTION():
         assert len(PLCURSOR._conn) <= 1
 
+    @staticmethod
+    def EXPECT_POOL_CONNECTIONS(open_count, in_use_count):
+        stats = PLCURSOR.poolStats()
+        assert (stats["open"], stats["in_use"]) == (extract_value(open_count), extract_value(in_use_count)), stats
+
+    @staticmethod
+    def EXPECT_POOL_EXHAUSTED():
+        """an autonomous transaction finds no connection, and fails without waiting"""
+        try:
+            PLCURSOR.AUTONOMOUS_TRANSACTION()
+        except RuntimeError:
+            return
+        raise AssertionError("the pool gave a connection")
+
+    @staticmethod
+    def EXPECT_STATEMENT_CACHE(hits, misses):
+        stats = PLCURSOR.statementCacheStats()
+        assert (stats["hits"], stats["misses"]) == (extract_value(hits), extract_value(misses)), stats
+
 class _FakeCursor:
     def __init__(self, conn):
         self.conn = conn
         self.mocksql: MOCKPLCURSOR.MOCKSQL = None
         self.rowcount = None
+        self.description = None
+        self.arraysize = 1
 
     def execute(self, sql: str, params=None):
         sql = extract_value(sql)
@@ -62,14 +92,32 @@ class _FakeCursor:
             del _sqls_mocked[key]
             self.mocksql.cursor = self
             self.rowcount = self.mocksql.rowcount
+            self.description = self.mocksql.description
             return
         raise RuntimeError("unable to find valid sql mock")
 
+    def executemany(self, sql: str, rows: List[Dict]):
+        self.execute(sql)
+
+    def fetchall(self):
+        if not self.mocksql.datasource:
+            return []
+        rows = list(self.mocksql.datasource)
+        self.mocksql.datasource.clear()
+        return rows
+
     def fetchone(self):
         if not self.mocksql.datasource:
             return None
         return self.mocksql.datasource.popleft()
 
+    def fetchmany(self, size: int = None):
+        datasource = self.mocksql.datasource
+        if not datasource:
+            return []
+        size = min(size or self.arraysize, len(datasource))
+        return [datasource.popleft() for _ in range(size)]
+
     def close(self):
         pass
 
@@ -81,10 +129,57 @@ class _FakeConnection:
     def cursor(self):
         cursor = _FakeCursor(self)
         cursor.execute = mock.Mock(wraps=cursor.execute)
+        cursor.executemany = mock.Mock(wraps=cursor.executemany)
         return cursor
 
     def close(self):
         pass
 
+class _FakeDriver:
+    def connect(self, connection_string: str):
+        return _FakeConnection(connection_string)
+
+class _FakeAsyncCursor:
+    """the fake cursor, behind the coroutines of an async driver"""
+
+    def __init__(self, cursor: _FakeCursor):
+        self.cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    async def execute(self, sql: str, params=None):
+        self.cursor.execute(sql, params)
+
+    async def executemany(self, sql: str, rows: List[Dict]):
+        self.cursor.executemany(sql, rows)
+
+    async def fetchall(self):
+        return self.cursor.fetchall()
+
+    async def fetchmany(self, size: int = None):
+        return self.cursor.fetchmany(size)
+
+    def close(self):
+        self.cursor.close()
+
+class _FakeAsyncConnection:
+    def __init__(self, connection_string: str):
+        self.connection = _FakeConnection(connection_string)
+        self.commit = mock.AsyncMock()
+        self.rollback = mock.AsyncMock()
+
+    def cursor(self):
+        return _FakeAsyncCursor(self.connection.cursor())
+
+    async def close(self):
+        self.connection.close()
+
+class _FakeAsyncDriver:
+    async def connect(self, connection_string: str):
+        return _FakeAsyncConnection(connection_string)
+
 _sqls_mocked: Dict[str, MOCKPLCURSOR.MOCKSQL] = {}
-cx_Oracle.connect = mock.Mock(side_effect=_FakeConnection)
+# the connection strings without a scheme, ie: mock@database
+PLCURSOR.driver = _FakeDriver()
+PLCURSOR_ASYNC.driver = _FakeAsyncDriver()
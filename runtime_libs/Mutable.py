@@ -1,6 +1,10 @@
-from NULL import NULL
+from NULL import NULL, NULL_VALUE
 
 class Mutable:
+    """the operators unwrap the other operand instead of making it a Mutable, and return a new Mutable.
+    the comparisons return the shared TRUE, FALSE or UNKNOWN"""
+    __slots__ = ("value",)
+
     def __init__(self, value):
         self.value: object = value
 
@@ -20,76 +24,114 @@ class Mutable:
         return self.value.__bool__()
 
     def __neg__(self):
-        return m(-(self.value))
+        return Mutable(-self.value)
 
     def __eq__(self, other):
-        other = extract_value(other)
-        my_type = type(self.value)
-        if my_type != NULL and not isinstance(other, my_type):
+        other = other.value if isinstance(other, Mutable) else _value(other)
+        value = self.value
+        if other is NULL_VALUE:
+            return UNKNOWN
+        my_type = value.__class__
+        if my_type is not NULL and not isinstance(other, my_type):
             other = my_type(other)
-        return m(self.value == other)
+        return _truth(value == other)
 
     def __ne__(self, other):
-        other = m(other)
-        return m(self.value != other.value)
+        other = other.value if isinstance(other, Mutable) else _value(other)
+        return _truth(self.value != other)
 
     def __gt__(self, other):
-        other = m(other)
-        return m(self.value > other.value)
+        other = other.value if isinstance(other, Mutable) else _value(other)
+        return _truth(self.value > other)
 
     def __lt__(self, other):
-        other = m(other)
-        return m(self.value < other.value)
+        other = other.value if isinstance(other, Mutable) else _value(other)
+        return _truth(self.value < other)
 
     def __ge__(self, other):
-        other = m(other)
-        return m(self.value >= other.value)
+        other = other.value if isinstance(other, Mutable) else _value(other)
+        return _truth(self.value >= other)
 
     def __le__(self, other):
-        other = m(other)
-        return m(self.value <= other.value)
+        other = other.value if isinstance(other, Mutable) else _value(other)
+        return _truth(self.value <= other)
 
     def __add__(self, other):
-        other = m(other)
-        return m(self.value + other.value)
+        other = other.value if isinstance(other, Mutable) else _value(other)
+        return Mutable(self.value + other)
 
     def __sub__(self, other):
-        other = m(other)
-        return m(self.value - other.value)
+        other = other.value if isinstance(other, Mutable) else _value(other)
+        return Mutable(self.value - other)
 
     def __mul__(self, other):
-        other = m(other)
-        return m(self.value * other.value)
+        other = other.value if isinstance(other, Mutable) else _value(other)
+        return Mutable(self.value * other)
 
     def __truediv__(self, other):
-        other = m(other)
-        return m(self.value / other.value)
+        other = other.value if isinstance(other, Mutable) else _value(other)
+        return Mutable(self.value / other)
 
     def __mod__(self, other):
-        other = m(other)
-        return m(self.value % other.value)
+        other = other.value if isinstance(other, Mutable) else _value(other)
+        return Mutable(self.value % other)
 
     def __ilshift__(self, other):
-        if isinstance(other, PleaseNotMutable):
+        if isinstance(other, Mutable):
+            self.value = other.value
+        elif isinstance(other, PleaseNotMutable):
             return other
-        other = m(other)
-        self.value = other.value
+        else:
+            self.value = _value(other)
         return self
 
+class Constant(Mutable):
+    """a literal that the generated code shares. it is only ever read"""
+    __slots__ = ()
+
+    def __ilshift__(self, other):
+        raise TypeError(f"the constant {self.value!r} can't be assigned")
+
 class PleaseNotMutable:
     pass
 
+TRUE = Constant(True)
+FALSE = Constant(False)
+UNKNOWN = Constant(NULL_VALUE)
+
+def _truth(value):
+    """the shared Constant of a boolean, or of the NULL a comparison with NULL is"""
+    if value is True:
+        return TRUE
+    if value is False:
+        return FALSE
+    if value is NULL_VALUE:
+        return UNKNOWN
+    return Mutable(value)
+
+def _value(other):
+    """the value of an operand that is not a Mutable"""
+    if other is None:
+        return NULL_VALUE
+    return other
+
 def m(value=None):
     if value is None:
-        value = NULL()
-    elif isinstance(value, PleaseNotMutable) or is_mutable(value):
+        return Mutable(NULL_VALUE)
+    if isinstance(value, (Mutable, PleaseNotMutable)):
         return value
     return Mutable(value)
 
+def mcopy(value):
+    """a new Mutable with the value of another, so a declaration never shares the Mutable of its initial value"""
+    if isinstance(value, Mutable):
+        return Mutable(value.value)
+    return value
+
 def is_mutable(value):
     return isinstance(value, Mutable)
 
 def extract_value(value):
-    if is_mutable(value):
+    if isinstance(value, Mutable):
         return value.value
     return value
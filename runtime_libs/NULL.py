@@ -1,5 +1,10 @@
-
 class NULL:
+    """there is only one NULL: NULL() returns NULL_VALUE, and it can be compared by identity"""
+    __slots__ = ()
+
+    def __new__(cls):
+        return NULL_VALUE
+
     def __call__(self):
         return self
 
@@ -41,3 +46,14 @@ class NULL:
 
     def __truediv__(self, other):
         return self
+
+    def __mod__(self, other):
+        return self
+
+    __radd__ = __add__
+    __rsub__ = __sub__
+    __rmul__ = __mul__
+    __rtruediv__ = __truediv__
+    __rmod__ = __mod__
+
+NULL_VALUE = object.__new__(NULL)
@@ -1,77 +1,307 @@
-from collections import deque
-from typing import List, Dict
-import cx_Oracle
-from PLHELPER import extract_value, m, NOT, NULL, PleaseNotMutable
+import threading
+import time
+from collections import deque, OrderedDict
+from typing import List, Dict, Callable
+from PLHELPER import extract_value, m, NOT, NULL_VALUE, TRUE, FALSE, UNKNOWN, PleaseNotMutable
 from PLRECORD import PLRECORD
+from PLSESSION import current_session, session_attribute
+from PLDRIVERS import OracleDriver, driver_for
 
 class _CURSOR(PleaseNotMutable):
 # pylint: disable=I0011,C0103
 
-    def __init__(self, sql: str, sql_binds: List[str], cursor_params_names: List[str]):
+    def __init__(self, sql: str, binds: Callable[[], Dict], cursor_params_names: List[str], arraysize: int = None):
+        """binds returns the values of the binds by their quoted name, when the cursor is opened.
+        arraysize is the number of rows fetched from the driver at once, PLCURSOR.arraysize if None"""
         self.sql = sql
         self.cursor = None
+        self.statements = None
         self.found = None
-        self.sql_binds = sql_binds
-        self.cursor_params_names = cursor_params_names
+        self.arraysize = arraysize
+        # the rows fetched from the driver that no FETCH has read yet
+        self.rows = deque()
+        self.exhausted = False
+        self.rowcount = 0
+        self.binds = binds
+        self.cursor_params_keys = [f'"{param_name}"' for param_name in cursor_params_names]
 
     def __call__(self):
         return self
 
-    def OPEN(self, cursor_params: list, the_locals: Dict):
-        params = {}
-        for i, param_name in enumerate(self.cursor_params_names):
-            value = cursor_params[i]
-            value = extract_value(value)
-            params[f'"{param_name}"'] = value
-        for sql_bind in self.sql_binds:
-            if sql_bind in self.cursor_params_names:
-                continue
-            if not sql_bind in the_locals:
-                raise RuntimeError(f"expected variable {sql_bind} to be defined in the locals")
-            value = the_locals[sql_bind]
-            value = extract_value(value)
-            if not isinstance(value, PLRECORD):
-                params[f'"{sql_bind}"'] = value
-                continue
-            for key in value.keys():
-                record_bind = f"{sql_bind}.{key}"
-                field = value.__getattr__(key)
-                field = extract_value(field)
-                params[f'"{record_bind}"'] = field
-        self.cursor = PLCURSOR.getConn().cursor()
+    def OPEN(self, cursor_params: list, binds: Dict = None):
+        params = self._params(cursor_params, binds)
+        self._acquire(PLCURSOR.getStatements())
         self.cursor.execute(self.sql, params)
-        PLCURSOR.rowcount = self.cursor.rowcount
+        self._opened()
+
+    def _params(self, cursor_params: list, binds: Dict = None) -> Dict:
+        params = {}
+        for key, value in zip(self.cursor_params_keys, cursor_params):
+            params[key] = extract_value(value)
+        if binds is None and self.binds is not None:
+            binds = self.binds()
+        if binds:
+            add_binds(params, binds)
+        return params
+
+    def _acquire(self, statements: "_StatementCache"):
+        if self.cursor is not None:
+            # opened again without a CLOSE. the driver cursor of the last OPEN goes back to its cache
+            self.CLOSE()
+        self.statements = statements
+        self.cursor = statements.acquire(self.sql)
+        arraysize = self.arraysize or PLCURSOR.arraysize
+        self.cursor.arraysize = arraysize
+        if hasattr(self.cursor, "prefetchrows"):
+            # the first rows come back with the execute, without a round trip of their own
+            self.cursor.prefetchrows = arraysize
+
+    def _opened(self):
+        self.rows.clear()
+        self.exhausted = False
+        self.found = None
+        self.rowcount = 0
+        current_session().rowcount = self.cursor.rowcount
+
+    def _fetch(self, size: int):
+        rows = self.cursor.fetchmany(size)
+        # a short batch is the last one, there is no need to ask for another
+        self.exhausted = len(rows) < size
+        self.rows.extend(rows)
 
     def FETCH(self, *args):
-        data = self.cursor.fetchone()
-        self.found = data is not None
+        if not self.rows and not self.exhausted:
+            self._fetch(self.cursor.arraysize)
+        self.found = bool(self.rows)
         if not self.found:
             return
+        data = self.rows.popleft()
+        self.rowcount += 1
         for i, arg in enumerate(args):
-            value = data[i]
-            if value is None:
-                value = NULL()
-            arg <<= m(value)
+            # <<= takes the value as it is, None for NULL
+            arg <<= data[i]
+
+    def BULK_COLLECT(self, *tables, limit=None):
+        """fills the tables with the next limit rows, or with every row left. one table per column,
+        or a table of records named by the columns"""
+        if limit is None:
+            rows = list(self.rows)
+            if not self.exhausted:
+                rows += self.cursor.fetchall()
+                self.exhausted = True
+            self.rows.clear()
+            self.found = bool(rows)
+        else:
+            limit = extract_value(limit)
+            if len(self.rows) < limit and not self.exhausted:
+                self._fetch(limit - len(self.rows))
+            rows = [self.rows.popleft() for _ in range(min(limit, len(self.rows)))]
+            # %NOTFOUND once a fetch comes short, though it brought rows
+            self.found = len(rows) == limit
+        self.rowcount += len(rows)
+        current_session().rowcount = len(rows)
+        if len(tables) == 1 and _is_record_type(tables[0].default_ctor):
+            # a table of records, whatever the number of columns
+            table = tables[0]
+            fields = [column[0].upper() for column in self.cursor.description] if rows else []
+            table.load([self._record(table.default_ctor(), fields, row) for row in rows])
+            return
+        for i, table in enumerate(tables):
+            table.load([m(row[i]) for row in rows])
+
+    @staticmethod
+    def _record(record: PLRECORD, fields: List[str], row) -> PLRECORD:
+        for field, value in zip(fields, row):
+            setattr(record, field, m(value))
+        return record
 
     def CLOSE(self):
-        self.cursor.close()
+        self.statements.release(self.sql, self.cursor)
         self.cursor = None
+        self.statements = None
+        self.rows.clear()
 
     def ISOPEN(self):
         return self.cursor != None
 
     def FOUND(self):
         if self.found is None:
-            return m(NULL())
-        return m(self.found)
+            return UNKNOWN
+        return TRUE if self.found else FALSE
 
     def NOTFOUND(self):
         return NOT(self.FOUND())
 
+    def ROWCOUNT(self):
+        """the rows fetched so far, not the ones in the buffer"""
+        return m(self.rowcount)
+
+def _is_record_type(ctor) -> bool:
+    return isinstance(ctor, type) and issubclass(ctor, PLRECORD)
+
+class _StatementCache:
+    """the driver cursors of a connection that are not open, by their sql, the least recently used first.
+    a cursor that executes the same sql again is not parsed again. an open cursor is out of the cache,
+    so the same sql opened twice at once gets two cursors"""
+
+    def __init__(self, conn, size: int, pool: "_ConnectionPool" = None):
+        self.conn = conn
+        self.size = size
+        # the pool the connection goes back to, with its cursors, when it is closed
+        self.pool = pool
+        self.cursors = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.closed = False
+        if hasattr(conn, "stmtcachesize"):
+            # the driver caches the parsed statements of the connection too
+            conn.stmtcachesize = max(conn.stmtcachesize, size)
+
+    def acquire(self, sql: str):
+        cursor = self.cursors.pop(sql, None)
+        if cursor is None:
+            self.misses += 1
+            return self.conn.cursor()
+        self.hits += 1
+        return cursor
+
+    def release(self, sql: str, cursor):
+        if self.closed or self.size <= 0 or sql in self.cursors:
+            cursor.close()
+            return
+        self.cursors[sql] = cursor
+        while len(self.cursors) > self.size:
+            _, oldest = self.cursors.popitem(last=False)
+            oldest.close()
+
+    def close(self):
+        """before its connection is closed. a cursor open by then is closed when released"""
+        self.closed = True
+        for cursor in self.cursors.values():
+            cursor.close()
+        self.cursors.clear()
+
+    def close_connection(self, rollback: bool = True):
+        """closes the connection, or returns it to its pool. rollback is False right after a commit or a rollback"""
+        if self.pool is not None:
+            self.pool.release(self, rollback)
+            return
+        self.close()
+        self.conn.close()
+
+class _ConnectionPool:
+    """the connections of every session, opened once and handed out again. the main connection of a
+    session is returned when the session is closed, the one of an autonomous transaction when it
+    commits or rolls back. a connection keeps its statement cache while idle.
+    at most size connections are open, acquire waits up to timeout seconds for one. a session that
+    holds them all would wait for itself, it fails at once instead"""
+
+    def __init__(self, driver, connection_string: str, size: int, timeout: float = None):
+        self.driver = driver
+        self.connection_string = connection_string
+        self.size = size
+        self.timeout = timeout
+        self.idle: List[_StatementCache] = []
+        self.open = 0
+        self.in_use = 0
+        self.acquires = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.acquire_time = 0.0
+        self.acquire_time_max = 0.0
+        self.closed = False
+        self.lock = threading.Condition()
+
+    def acquire(self, held: int = 0) -> _StatementCache:
+        """held is the number of connections of the pool that the session has already"""
+        start = time.perf_counter()
+        with self.lock:
+            if not self.idle and self.open >= self.size:
+                if held >= self.size:
+                    raise RuntimeError(POOL_EXHAUSTED.format(size=self.size))
+                self.waits += 1
+                if not self.lock.wait_for(lambda: self.idle or self.open < self.size, self.timeout):
+                    self.timeouts += 1
+                    raise RuntimeError(POOL_TIMEOUT.format(size=self.size, timeout=self.timeout))
+            if self.idle:
+                statements = self.idle.pop()
+            else:
+                # reserved before connecting, out of the lock
+                self.open += 1
+                statements = None
+            self.in_use += 1
+        if statements is None:
+            try:
+                conn = self.driver.connect(self.connection_string)
+            except BaseException:
+                with self.lock:
+                    self.open -= 1
+                    self.in_use -= 1
+                    self.lock.notify()
+                raise
+            statements = _StatementCache(conn, PLCURSOR.statement_cache_size, self)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.acquires += 1
+            self.acquire_time += elapsed
+            self.acquire_time_max = max(self.acquire_time_max, elapsed)
+        return statements
+
+    def release(self, statements: _StatementCache, rollback: bool = True):
+        if rollback:
+            # the work a session left uncommitted is not seen by the next one
+            statements.conn.rollback()
+        with self.lock:
+            self.in_use -= 1
+            if self.closed:
+                self.open -= 1
+            else:
+                self.idle.append(statements)
+                statements = None
+            self.lock.notify()
+        if statements is not None:
+            statements.close()
+            statements.conn.close()
+
+    def close(self):
+        """closes the idle connections, and the ones in use when they are released"""
+        with self.lock:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.open -= len(idle)
+        for statements in idle:
+            statements.close()
+            statements.conn.close()
+
+    def stats(self) -> Dict[str, float]:
+        with self.lock:
+            return {
+                "size": self.size,
+                "open": self.open,
+                "in_use": self.in_use,
+                "idle": len(self.idle),
+                "acquires": self.acquires,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "acquire_time_avg": self.acquire_time / self.acquires if self.acquires else 0.0,
+                "acquire_time_max": self.acquire_time_max,
+            }
+
 class PLCURSOR:
 # pylint: disable=I0011,C0103
     _connection_string: str = None
-    _conn = deque()
+    # the driver of the connection string, PLDRIVERS.driver_for
+    _driver = None
+    # the driver of the connection strings without a scheme
+    driver = OracleDriver()
+    # shared by the sessions, None to open a connection each time
+    _pool: _ConnectionPool = None
+    # those of the current session
+    _conn = session_attribute("connections")
+    _statements = session_attribute("statements")
+    statement_cache_size: int = 50
+    # rows per fetch from the driver, of the cursors without an arraysize of their own
+    arraysize: int = 100
 
     @staticmethod
     def startConnection(force=False):
@@ -79,8 +309,14 @@ class PLCURSOR:
             return
         if not PLCURSOR._connection_string:
             raise RuntimeError(NO_CONNECTION_STRING)
-        new_conn = cx_Oracle.connect(PLCURSOR._connection_string)
-        PLCURSOR._conn.appendleft(new_conn)
+        if PLCURSOR._pool is not None:
+            pool = PLCURSOR._pool
+            statements = pool.acquire(sum(1 for statements in PLCURSOR._statements if statements.pool is pool))
+        else:
+            conn = PLCURSOR._driver.connect(PLCURSOR._connection_string)
+            statements = _StatementCache(conn, PLCURSOR.statement_cache_size)
+        PLCURSOR._conn.appendleft(statements.conn)
+        PLCURSOR._statements.appendleft(statements)
 
     @staticmethod
     def getConn():
@@ -88,18 +324,75 @@ class PLCURSOR:
         return PLCURSOR._conn[0]
 
     @staticmethod
-    def SETUP(connection_string: str):
+    def getStatements() -> _StatementCache:
+        PLCURSOR.startConnection()
+        return PLCURSOR._statements[0]
+
+    @staticmethod
+    def statementCacheStats() -> Dict[str, int]:
+        """of the connection in use"""
+        statements = PLCURSOR.getStatements()
+        return {"hits": statements.hits, "misses": statements.misses, "cached": len(statements.cursors)}
+
+    @staticmethod
+    def poolStats() -> Dict[str, float]:
+        """the connections open, in use and idle, the acquires, those that waited or timed out, and
+        their average and maximum time in seconds"""
+        if PLCURSOR._pool is None:
+            return {}
+        return PLCURSOR._pool.stats()
+
+    @staticmethod
+    def SETUP(connection_string: str, statement_cache_size: int = None, arraysize: int = None,
+              pool_size: int = None, pool_timeout: float = None, driver=None):
+        """statement_cache_size is the number of cursors kept per connection. 0 disables the cache.
+        arraysize is the number of rows fetched at once by the cursors.
+        pool_size, the connections open at most, makes the sessions and the autonomous transactions
+        take them from a pool. pool_timeout is the seconds to wait for one, forever if None.
+        driver connects, the one of the scheme of the connection string if None, ie: sqlite:FILENAME,
+        PLCURSOR.driver without one"""
+        PLCURSOR.configure(connection_string, statement_cache_size, arraysize, pool_size, pool_timeout, driver)
+        PLCURSOR.startConnection()
+
+    @staticmethod
+    def configure(connection_string: str, statement_cache_size: int = None, arraysize: int = None,
+                  pool_size: int = None, pool_timeout: float = None, driver=None):
+        """SETUP, without connecting"""
         if not isinstance(connection_string, str):
             connection_string = connection_string.value
         PLCURSOR._connection_string = connection_string
-        PLCURSOR.startConnection()
+        PLCURSOR._driver = driver or driver_for(connection_string, PLCURSOR.driver)
+        if pool_size is not None:
+            if PLCURSOR._pool is not None:
+                PLCURSOR._pool.close()
+            PLCURSOR._pool = _ConnectionPool(PLCURSOR._driver, connection_string, extract_value(pool_size),
+                                             extract_value(pool_timeout))
+        if arraysize is not None:
+            PLCURSOR.arraysize = extract_value(arraysize)
+        if statement_cache_size is not None:
+            PLCURSOR.statement_cache_size = extract_value(statement_cache_size)
+            for statements in PLCURSOR._statements:
+                statements.size = PLCURSOR.statement_cache_size
 
     @staticmethod
-    def FULL_EXECUTE(sql: str, sql_vars: List[str], the_locals: Dict):
-        cursor = PLCURSOR.CURSOR(sql, sql_vars, [])
-        cursor.OPEN([], the_locals)
+    def FULL_EXECUTE(sql: str, binds: Dict):
+        cursor = PLCURSOR.CURSOR(sql, None, [])
+        cursor.OPEN([], binds)
         cursor.CLOSE()
 
+    @staticmethod
+    def FORALL(sql: str, binds: Callable[..., Dict], indexes):
+        """executes the sql once per index, with the binds of each, in a single round trip"""
+        rows = forall_rows(binds, indexes)
+        if not rows:
+            current_session().rowcount = 0
+            return
+        statements = PLCURSOR.getStatements()
+        cursor = statements.acquire(sql)
+        cursor.executemany(sql, rows)
+        current_session().rowcount = cursor.rowcount
+        statements.release(sql, cursor)
+
     @staticmethod
     def AUTONOMOUS_TRANSACTION():
         PLCURSOR.startConnection(force=True)
@@ -118,10 +411,11 @@ class PLCURSOR:
     def closeLastConn():
         if len(PLCURSOR._conn) <= 1:
             return
-        last_conn = PLCURSOR._conn.popleft()
-        last_conn.close()
+        PLCURSOR._conn.popleft()
+        # just committed or rolled back
+        PLCURSOR._statements.popleft().close_connection(rollback=False)
 
-    rowcount = None
+    rowcount = session_attribute("rowcount")
 
     @staticmethod
     def ISOPEN():
@@ -129,18 +423,44 @@ class PLCURSOR:
 
     @staticmethod
     def ROWCOUNT():
-        return PLCURSOR.rowcount
+        if PLCURSOR.rowcount is None:
+            return m()
+        return m(PLCURSOR.rowcount)
 
     CURSOR = _CURSOR
 
+def add_binds(params: Dict, binds: Dict):
+    for key, value in binds.items():
+        value = extract_value(value)
+        if not isinstance(value, PLRECORD):
+            params[key] = value
+            continue
+        # a record bound whole binds every field
+        for field in value.keys():
+            params[f'{key[:-1]}.{field}"'] = extract_value(value.__getattr__(field))
+
+def forall_rows(binds: Callable[..., Dict], indexes) -> List[Dict]:
+    rows = []
+    for index in indexes:
+        params = {}
+        add_binds(params, binds(index))
+        rows.append(params)
+    return rows
+
 def execute_immediate_into(sql, *into):
-    cursor = PLCURSOR.CURSOR(sql, [], [])
-    cursor.OPEN([], {})
+    # the sql is an expression, ie: 'select ' || sbColumns || ' from dual'
+    cursor = PLCURSOR.CURSOR(extract_value(sql), None, [])
+    cursor.OPEN([])
     if into:
         cursor.FETCH(*into)
+        # the rows fetched, as for a SELECT INTO
+        current_session().rowcount = cursor.rowcount
     cursor.CLOSE()
 
 NO_CONNECTION_STRING = """
 The connection string is None.
 Please call PLCURSOR.SETUP("user/pass@database") first
 """
+
+POOL_TIMEOUT = "the {size} connections of the pool were in use for {timeout} seconds"
+POOL_EXHAUSTED = "the session holds the {size} connections of the pool, it can't wait for another one"
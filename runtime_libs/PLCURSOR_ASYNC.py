@@ -0,0 +1,149 @@
+import inspect
+from typing import Dict, Callable
+from PLHELPER import m, extract_value
+from PLCURSOR import PLCURSOR, _CURSOR, _StatementCache, forall_rows, NO_CONNECTION_STRING
+from PLSESSION import current_session
+from PLDRIVERS import OracleAsyncDriver, ASYNC_DRIVERS, driver_for
+
+class _ASYNC_CURSOR(_CURSOR):
+    """_CURSOR, with the round trips awaited. FETCH and BULK_COLLECT fill the buffer first, so the
+    ones of _CURSOR never reach the driver"""
+# pylint: disable=I0011,C0103,W0236
+
+    async def OPEN(self, cursor_params: list, binds: Dict = None):
+        params = self._params(cursor_params, binds)
+        self._acquire(await PLCURSOR_ASYNC.getStatements())
+        await self.cursor.execute(self.sql, params)
+        self._opened()
+
+    async def _fetch(self, size: int):
+        rows = await self.cursor.fetchmany(size)
+        self.exhausted = len(rows) < size
+        self.rows.extend(rows)
+
+    async def FETCH(self, *args):
+        if not self.rows and not self.exhausted:
+            await self._fetch(self.cursor.arraysize)
+        super().FETCH(*args)
+
+    async def BULK_COLLECT(self, *tables, limit=None):
+        if not self.exhausted:
+            if limit is None:
+                self.rows.extend(await self.cursor.fetchall())
+                self.exhausted = True
+            elif len(self.rows) < extract_value(limit):
+                await self._fetch(extract_value(limit) - len(self.rows))
+        super().BULK_COLLECT(*tables, limit=limit)
+
+class _AsyncStatementCache(_StatementCache):
+
+    async def close_connection(self, rollback: bool = True):
+        self.close()
+        await self.conn.close()
+
+class PLCURSOR_ASYNC(PLCURSOR):
+    """PLCURSOR, for the code generated with --async. the settings, the connections and SQL%ROWCOUNT
+    are the ones of PLCURSOR, only the round trips to the database are coroutines. a connection comes
+    from an async driver, the one of PLDRIVERS.ASYNC_DRIVERS for the scheme of the connection string,
+    PLCURSOR_ASYNC.driver without one, unless SETUP is given another one"""
+# pylint: disable=I0011,C0103,W0236
+
+    # the driver of the connection string
+    _driver = None
+    # the driver of the connection strings without a scheme
+    driver = OracleAsyncDriver()
+
+    @staticmethod
+    async def startConnection(force=False):
+        if PLCURSOR._conn and not force:
+            return
+        if not PLCURSOR._connection_string:
+            raise RuntimeError(NO_CONNECTION_STRING)
+        driver = PLCURSOR_ASYNC._driver or PLCURSOR_ASYNC.driver
+        new_conn = await driver.connect(PLCURSOR._connection_string)
+        PLCURSOR._conn.appendleft(new_conn)
+        PLCURSOR._statements.appendleft(_AsyncStatementCache(new_conn, PLCURSOR.statement_cache_size))
+
+    @staticmethod
+    async def getConn():
+        await PLCURSOR_ASYNC.startConnection()
+        return PLCURSOR._conn[0]
+
+    @staticmethod
+    async def getStatements() -> _StatementCache:
+        await PLCURSOR_ASYNC.startConnection()
+        return PLCURSOR._statements[0]
+
+    @staticmethod
+    async def SETUP(connection_string: str, statement_cache_size: int = None, arraysize: int = None, driver=None):
+        """PLCURSOR.SETUP. the connections of a pool are not async, so there is no pool_size"""
+        PLCURSOR.configure(connection_string, statement_cache_size, arraysize)
+        PLCURSOR_ASYNC._driver = driver or driver_for(PLCURSOR._connection_string, PLCURSOR_ASYNC.driver, ASYNC_DRIVERS)
+        await PLCURSOR_ASYNC.startConnection()
+
+    @staticmethod
+    async def FULL_EXECUTE(sql: str, binds: Dict):
+        cursor = PLCURSOR_ASYNC.CURSOR(sql, None, [])
+        await cursor.OPEN([], binds)
+        cursor.CLOSE()
+
+    @staticmethod
+    async def FORALL(sql: str, binds: Callable[..., Dict], indexes):
+        rows = forall_rows(binds, indexes)
+        if not rows:
+            current_session().rowcount = 0
+            return
+        statements = await PLCURSOR_ASYNC.getStatements()
+        cursor = statements.acquire(sql)
+        await cursor.executemany(sql, rows)
+        current_session().rowcount = cursor.rowcount
+        statements.release(sql, cursor)
+
+    @staticmethod
+    async def SYS_CONTEXT(namespace, parameter):
+        """PLGLOBALS.SYS_CONTEXT"""
+        cursor = PLCURSOR_ASYNC.CURSOR('select sys_context(:NAMESPACE, :PARAMETER) from dual', None, [])
+        await cursor.OPEN([], {'"NAMESPACE"': namespace, '"PARAMETER"': parameter})
+        value = m()
+        await cursor.FETCH(value)
+        cursor.CLOSE()
+        return value
+
+    @staticmethod
+    async def AUTONOMOUS_TRANSACTION():
+        await PLCURSOR_ASYNC.startConnection(force=True)
+
+    @staticmethod
+    async def commit():
+        await (await PLCURSOR_ASYNC.getConn()).commit()
+        await PLCURSOR_ASYNC.closeLastConn()
+
+    @staticmethod
+    async def rollback():
+        await (await PLCURSOR_ASYNC.getConn()).rollback()
+        await PLCURSOR_ASYNC.closeLastConn()
+
+    @staticmethod
+    async def closeLastConn():
+        if len(PLCURSOR._conn) <= 1:
+            return
+        PLCURSOR._conn.popleft()
+        await PLCURSOR._statements.popleft().close_connection(rollback=False)
+
+    CURSOR = _ASYNC_CURSOR
+
+async def execute_immediate_into(sql, *into):
+    # the sql is an expression, ie: 'select ' || sbColumns || ' from dual'
+    cursor = PLCURSOR_ASYNC.CURSOR(extract_value(sql), None, [])
+    await cursor.OPEN([])
+    if into:
+        await cursor.FETCH(*into)
+        # the rows fetched, as for a SELECT INTO
+        current_session().rowcount = cursor.rowcount
+    cursor.CLOSE()
+
+async def awaited(value):
+    """the value of a call to a package of another script, that may be a procedure or a variable"""
+    if inspect.isawaitable(value):
+        return await value
+    return value
@@ -0,0 +1,207 @@
+import re
+import asyncio
+import sqlite3
+from typing import Dict, List, Tuple
+
+class OracleDriver:
+    """cx_Oracle. a driver connects, and returns a DB-API connection that understands the sql
+    of the generated code, with its binds named :"NAME" """
+
+    def connect(self, connection_string: str):
+        import cx_Oracle
+        return cx_Oracle.connect(connection_string)
+
+class OracleAsyncDriver:
+    """the async api of python-oracledb. an async driver connects, and its connections have the methods
+    of a DB-API connection, cursor() and cursor.close() excepted, as coroutines"""
+
+    async def connect(self, connection_string: str):
+        try:
+            import oracledb
+        except ImportError as error:
+            raise RuntimeError(NO_ASYNC_DRIVER) from error
+        return await oracledb.connect_async(dsn=connection_string)
+
+class SQLiteDriver:
+    """an embedded database, to run the generated code without an Oracle instance.
+    sqlite:FILENAME, or sqlite::memory: for a database in memory shared by the connections of the
+    process, ie: those of the autonomous transactions. it has a dual table"""
+
+    def connect(self, connection_string: str):
+        filename = connection_string[len("sqlite:"):]
+        if filename == ":memory:":
+            conn = sqlite3.connect("file:plcursor?mode=memory&cache=shared", uri=True, check_same_thread=False)
+        else:
+            # a connection of a pool, or of an idle session, can be used by another thread
+            conn = sqlite3.connect(filename, check_same_thread=False)
+        conn.execute("create temp view if not exists dual as select 'X' as dummy")
+        return _SQLiteConnection(conn)
+
+class SQLiteAsyncDriver:
+    """SQLiteDriver, for the code generated with --async. the statements run in the threads of
+    the event loop, so they don't block it"""
+
+    async def connect(self, connection_string: str):
+        conn = await _in_thread(SQLiteDriver().connect, connection_string)
+        return _SQLiteAsyncConnection(conn)
+
+async def _in_thread(function, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+class _SQLiteConnection:
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def cursor(self):
+        return _SQLiteCursor(self.conn.cursor())
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+class _SQLiteCursor:
+    """executes the sql with its binds renamed, :"RC.ID" is no name for sqlite. the rowcount of a query
+    is the rows fetched so far, as for Oracle, where sqlite has -1"""
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self.cursor = cursor
+        self.rowcount = -1
+
+    def __getattr__(self, name):
+        # arraysize, description, close
+        return getattr(self.cursor, name)
+
+    def __setattr__(self, name, value):
+        if name == "arraysize":
+            self.cursor.arraysize = value
+        else:
+            super().__setattr__(name, value)
+
+    def execute(self, sql: str, params: Dict = None):
+        sql, names = translate_binds(sql)
+        self.cursor.execute(sql, _rename(names, params or {}))
+        self.rowcount = 0 if self.cursor.description is not None else self.cursor.rowcount
+
+    def executemany(self, sql: str, rows: List[Dict]):
+        sql, names = translate_binds(sql)
+        self.cursor.executemany(sql, [_rename(names, params) for params in rows])
+        self.rowcount = self.cursor.rowcount
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        if row is not None:
+            self.rowcount += 1
+        return row
+
+    def fetchmany(self, size: int = None):
+        rows = self.cursor.fetchmany(self.cursor.arraysize if size is None else size)
+        self.rowcount += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        self.rowcount += len(rows)
+        return rows
+
+class _SQLiteAsyncConnection:
+
+    def __init__(self, conn: _SQLiteConnection):
+        self.conn = conn
+
+    def cursor(self):
+        return _SQLiteAsyncCursor(self.conn.cursor())
+
+    async def commit(self):
+        await _in_thread(self.conn.commit)
+
+    async def rollback(self):
+        await _in_thread(self.conn.rollback)
+
+    async def close(self):
+        await _in_thread(self.conn.close)
+
+class _SQLiteAsyncCursor:
+
+    def __init__(self, cursor: _SQLiteCursor):
+        self.cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __setattr__(self, name, value):
+        if name == "arraysize":
+            self.cursor.arraysize = value
+        else:
+            super().__setattr__(name, value)
+
+    async def execute(self, sql: str, params: Dict = None):
+        await _in_thread(self.cursor.execute, sql, params)
+
+    async def executemany(self, sql: str, rows: List[Dict]):
+        await _in_thread(self.cursor.executemany, sql, rows)
+
+    async def fetchmany(self, size: int = None):
+        return await _in_thread(self.cursor.fetchmany, size or self.cursor.arraysize)
+
+    async def fetchall(self):
+        return await _in_thread(self.cursor.fetchall)
+
+    def close(self):
+        self.cursor.close()
+
+# the quoted strings, skipped, and the binds: :"RC.ID" or :NAME
+_BINDS = re.compile(r"""'(?:[^']|'')*'|:"([^"]+)"|:([A-Za-z][A-Za-z0-9_$#]*)""")
+_translated: Dict[str, Tuple[str, List[Tuple[str, str]]]] = {}
+# the sql of EXECUTE IMMEDIATE can be built at run time
+TRANSLATED_MAX = 1000
+
+def translate_binds(sql: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """the sql with its binds named :B0, :B1..., and the key in the params of the generated code of each.
+    the generated code runs the same sql many times, so each one is translated once"""
+    translated = _translated.get(sql)
+    if translated is not None:
+        return translated
+    names: Dict[str, str] = {}
+
+    def rename(match):
+        if match.group(1) is None and match.group(2) is None:
+            return match.group(0)
+        # an unquoted name is upper case, the keys of the params are quoted
+        key = f'"{match.group(1)}"' if match.group(1) is not None else f'"{match.group(2).upper()}"'
+        name = names.setdefault(key, f"B{len(names)}")
+        return ":" + name
+
+    if len(_translated) >= TRANSLATED_MAX:
+        _translated.clear()
+    translated = _translated[sql] = (_BINDS.sub(rename, sql), list(names.items()))
+    return translated
+
+def _rename(names: List[Tuple[str, str]], params: Dict) -> Dict:
+    return {name: params[key] for key, name in names}
+
+# by the scheme of the connection string, ie: sqlite:benchmark.db
+DRIVERS = {
+    "sqlite": SQLiteDriver(),
+}
+ASYNC_DRIVERS = {
+    "sqlite": SQLiteAsyncDriver(),
+}
+
+def driver_for(connection_string: str, default, drivers: Dict = None):
+    """the driver of the scheme of the connection string, in DRIVERS or drivers, default if it has none"""
+    drivers = DRIVERS if drivers is None else drivers
+    scheme, colon, _ = connection_string.partition(":")
+    if colon and scheme in drivers:
+        return drivers[scheme]
+    return default
+
+NO_ASYNC_DRIVER = """
+The code generated with --async needs an async driver.
+Please install python-oracledb, or call PLCURSOR_ASYNC.SETUP("user/pass@database", driver=...)
+"""
@@ -1,6 +1,7 @@
 import sys
-from PLHELPER import m, extract_value, ISNULL, NULL
+from PLHELPER import m, extract_value, ISNULL, NULL_VALUE
 from PLCURSOR import PLCURSOR
+from PLSESSION import current_session, session_attribute
 
 class _PL_EXCEPTION(RuntimeError):
     pass
@@ -13,7 +14,7 @@ class PLGLOBALS:
     @staticmethod
     def CHR(n):
         if ISNULL(n):
-            return NULL()
+            return NULL_VALUE
         value = extract_value(n)
         if isinstance(value, str):
             value = int(value)
@@ -33,14 +34,14 @@ class PLGLOBALS:
     @staticmethod
     def LENGTH(string):
         if ISNULL(string):
-            return NULL()
+            return NULL_VALUE
         string = extract_value(string)
         return len(string)
 
     @staticmethod
     def LOWER(string):
         if ISNULL(string):
-            return NULL()
+            return NULL_VALUE
         string = extract_value(string)
         string = str(string)
         string = string.lower()
@@ -69,14 +70,15 @@ class PLGLOBALS:
         error_number = extract_value(error_number)
         message = extract_value(message)
         message = f"ORA{error_number}: {message}"
-        PLGLOBALS.SQLCODE = m(error_number)
-        PLGLOBALS.SQLERRM = m(message)
+        session = current_session()
+        session.sqlcode = m(error_number)
+        session.sqlerrm = m(message)
         raise _PL_EXCEPTION
 
     @staticmethod
     def REPLACE(char, search, replacement=None):
         if replacement is None:
-            replacement = NULL()
+            replacement = NULL_VALUE
         if ISNULL(char) or ISNULL(search):
             return char
         char: str = extract_value(char)
@@ -89,13 +91,13 @@ class PLGLOBALS:
         return m(value)
 
     SQL = PLCURSOR
-    SQLCODE = m(0)
-    SQLERRM = NULL()
+    SQLCODE = session_attribute("sqlcode")
+    SQLERRM = session_attribute("sqlerrm")
 
     @staticmethod
     def SUBSTR(string, position, length=None):
         if ISNULL(string) or ISNULL(position):
-            return NULL()
+            return NULL_VALUE
         string = extract_value(string)
         position = extract_value(position)
         length = extract_value(length)
@@ -111,8 +113,8 @@ class PLGLOBALS:
 
     @staticmethod
     def SYS_CONTEXT(namespace, parameter):
-        cursor = PLCURSOR.CURSOR('select sys_context(:NAMESPACE, :PARAMETER) from dual', ['NAMESPACE', 'PARAMETER'], [])
-        cursor.OPEN([], {'NAMESPACE': namespace, 'PARAMETER': parameter})
+        cursor = PLCURSOR.CURSOR('select sys_context(:NAMESPACE, :PARAMETER) from dual', None, [])
+        cursor.OPEN([], {'"NAMESPACE"': namespace, '"PARAMETER"': parameter})
         value = m()
         cursor.FETCH(value)
         cursor.CLOSE()
@@ -121,7 +123,7 @@ class PLGLOBALS:
     @staticmethod
     def TO_CHAR(value):
         if ISNULL(value):
-            return NULL()
+            return NULL_VALUE
         value = extract_value(value)
         value = str(value)
         return m(value)
@@ -129,7 +131,7 @@ class PLGLOBALS:
     @staticmethod
     def TO_NUMBER(value):
         if ISNULL(value):
-            return NULL()
+            return NULL_VALUE
         value = extract_value(value)
         value = float(value)
         if value.is_integer():
@@ -139,7 +141,7 @@ class PLGLOBALS:
     @staticmethod
     def TRIM(value):
         if ISNULL(value):
-            return NULL()
+            return NULL_VALUE
         value = extract_value(value)
         value = value.strip(" ")
         return m(value)
@@ -147,7 +149,7 @@ class PLGLOBALS:
     @staticmethod
     def LTRIM(value):
         if ISNULL(value):
-            return NULL()
+            return NULL_VALUE
         value = extract_value(value)
         value = value.lstrip(" ")
         return m(value)
@@ -155,7 +157,7 @@ class PLGLOBALS:
     @staticmethod
     def RTRIM(value):
         if ISNULL(value):
-            return NULL()
+            return NULL_VALUE
         value = extract_value(value)
         value = value.rstrip(" ")
         return m(value)
@@ -163,7 +165,7 @@ class PLGLOBALS:
     @staticmethod
     def padstr(to_left: bool, value, count, fill):
         if ISNULL(value) or ISNULL(count) or ISNULL(fill) or count <= m(0):
-            return NULL()
+            return NULL_VALUE
         if fill is None:
             fill = m(' ')
         value = extract_value(value)
@@ -194,7 +196,7 @@ class PLGLOBALS:
     @staticmethod
     def UPPER(string):
         if ISNULL(string):
-            return NULL()
+            return NULL_VALUE
         string = extract_value(string)
         string = str(string)
         string = string.upper()
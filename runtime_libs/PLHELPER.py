@@ -1,30 +1,30 @@
-from NULL import NULL
-from Mutable import extract_value, is_mutable, m, PleaseNotMutable
+from NULL import NULL, NULL_VALUE
+from Mutable import extract_value, is_mutable, m, mcopy, Constant, PleaseNotMutable, TRUE, FALSE, UNKNOWN
 
 def ISNULL(value):
     value = extract_value(value)
-    ret = isinstance(value, NULL) \
-        or isinstance(value, str) and value == ""
-    ret = m(ret)
-    return ret
+    if value is NULL_VALUE or value == "":
+        return TRUE
+    return FALSE
 
 def NOT(value):
     value = extract_value(value)
-    if isinstance(value, NULL) \
-        or isinstance(value, str) and value == "":
-        ret = NULL()
-    else:
-        ret = not value
-    ret = m(ret)
-    return ret
+    if value is NULL_VALUE or value == "":
+        return UNKNOWN
+    return FALSE if value else TRUE
 
 def CONCAT(v1, v2):
     v1 = extract_value(v1)
     v2 = extract_value(v2)
     return m(str(v1) + str(v2))
 
-def mrange(x, y):
+def mrange(x, y, reverse=False):
+    for i in irange(x, y, reverse):
+        yield m(i)
+
+def irange(x, y, reverse=False):
     x = extract_value(x)
     y = extract_value(y)
-    for i in range(x, y + 1):
-        yield m(i)
+    if reverse:
+        return range(y, x - 1, -1)
+    return range(x, y + 1)
@@ -0,0 +1,126 @@
+import copy
+import types
+import inspect
+import contextlib
+import contextvars
+from collections import deque
+from Mutable import m
+
+class PLSESSION:
+    """the state of one PL/SQL session: the connections, and their statement caches, SQL%ROWCOUNT,
+    SQLCODE, SQLERRM and the variables of the packages. the code that runs out of a session(),
+    shares the one of the process"""
+
+    def __init__(self):
+        # the connection of the autonomous transaction in progress first
+        self.connections = deque()
+        # the statement cache of each connection, in the same order
+        self.statements = deque()
+        self.rowcount = None
+        self.sqlcode = m(0)
+        self.sqlerrm = m()
+        # by the class of the package that declares them
+        self.packages = {}
+
+    def package_variables(self, package: type) -> dict:
+        """a session starts with a copy of the variables, as the package initialized them"""
+        variables = self.packages.get(package)
+        if variables is None:
+            variables = self.packages[package] = copy.deepcopy(package.__dict__["_variables"])
+        return variables
+
+    def close(self):
+        while self.connections:
+            self.connections.popleft()
+            self.statements.popleft().close_connection()
+
+    async def aclose(self):
+        """close, for the connections of an async driver"""
+        while self.connections:
+            self.connections.popleft()
+            closed = self.statements.popleft().close_connection()
+            if inspect.isawaitable(closed):
+                await closed
+
+_PROCESS_SESSION = PLSESSION()
+_CURRENT_SESSION = contextvars.ContextVar("PLSESSION", default=_PROCESS_SESSION)
+
+def current_session() -> PLSESSION:
+    return _CURRENT_SESSION.get()
+
+@contextlib.contextmanager
+def session():
+    """runs the block in a new session, closed at the end. the threads and asyncio tasks that run
+    a block each, see their own connections and variables, ie: a worker serving many requests"""
+    new_session = PLSESSION()
+    token = _CURRENT_SESSION.set(new_session)
+    try:
+        yield new_session
+    finally:
+        _CURRENT_SESSION.reset(token)
+        new_session.close()
+
+@contextlib.asynccontextmanager
+async def async_session():
+    """session, for the code generated with --async"""
+    new_session = PLSESSION()
+    token = _CURRENT_SESSION.set(new_session)
+    try:
+        yield new_session
+    finally:
+        _CURRENT_SESSION.reset(token)
+        await new_session.aclose()
+
+class session_attribute:
+    """a class attribute that reads the one of the current session, ie: PLCURSOR.rowcount"""
+# pylint: disable=I0011,C0103
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        return getattr(_CURRENT_SESSION.get(), self.name)
+
+def _is_variable(name: str, value) -> bool:
+    if name.startswith("__"):
+        return False
+    # the procedures and functions, the types and the exceptions are not state
+    return not isinstance(value, (staticmethod, classmethod, type, types.FunctionType))
+
+class _PackageVariable:
+    """a variable of a package, read from the current session, ie: PKG.X"""
+
+    def __init__(self, owner: type, name: str):
+        self.owner = owner
+        self.name = name
+
+    def __get__(self, instance, owner):
+        return _CURRENT_SESSION.get().package_variables(self.owner)[self.name]
+
+class _PackageType(type):
+    """keeps the variables of a package in the current session, instead of in the class"""
+
+    def __new__(mcs, name, bases, namespace):
+        variables = {key: value for key, value in namespace.items() if _is_variable(key, value)}
+        namespace["_variables"] = variables
+        cls = super().__new__(mcs, name, bases, namespace)
+        for key in variables:
+            type.__setattr__(cls, key, _PackageVariable(cls, key))
+        return cls
+
+    def __setattr__(cls, name, value):
+        variable = _find_variable(cls, name)
+        if not isinstance(variable, _PackageVariable):
+            type.__setattr__(cls, name, value)
+            return
+        # ie: PKG.X <<= 1 sets PKG.X back
+        _CURRENT_SESSION.get().package_variables(variable.owner)[name] = value
+
+def _find_variable(cls: type, name: str):
+    for base in cls.__mro__:
+        if name in base.__dict__:
+            return base.__dict__[name]
+    return None
+
+class PLPACKAGE(metaclass=_PackageType):
+    """the base of the generated packages"""
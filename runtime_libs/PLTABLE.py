@@ -1,65 +1,92 @@
-from PLHELPER import m, extract_value, NULL
+from bisect import bisect_left, bisect_right, insort
+from PLHELPER import m, extract_value, NULL_VALUE
 
 class PLTABLE:
+    """an index-by table. only the elements assigned take memory, and the keys,
+    numbers or strings, are kept sorted for FIRST, LAST, NEXT and PRIOR"""
 
     def __init__(self, default_ctor=m):
-        self.inner_list = []
+        self.elements = {}
+        self.sorted_keys = []
         self.default_ctor = default_ctor
 
     def __getitem__(self, index):
-        index = extract_value(index)
-        index -= 1
-        self._safe_access_index(index)
-        return self.inner_list[index]
+        key = extract_value(index)
+        try:
+            return self.elements[key]
+        except KeyError:
+            # the element is created when first used, ie: tb(1).id := 1
+            value = self.elements[key] = self.default_ctor()
+            self._add_key(key)
+            return value
 
     def __setitem__(self, index, value):
-        index = extract_value(index)
-        index -= 1
-        self._safe_access_index(index)
-        self.inner_list[index] = value
+        key = extract_value(index)
+        if key not in self.elements:
+            self._add_key(key)
+        self.elements[key] = value
 
     def __call__(self, index=None):
         if index is None:
             return self
         return self[index]
 
-    def DELETE(self):
-        self.inner_list.clear()
+    def DELETE(self, index=None, upper=None):
+        if index is None:
+            self.elements.clear()
+            self.sorted_keys.clear()
+            return
+        lower = extract_value(index)
+        upper = lower if upper is None else extract_value(upper)
+        start = bisect_left(self.sorted_keys, lower)
+        stop = bisect_right(self.sorted_keys, upper)
+        for key in self.sorted_keys[start:stop]:
+            del self.elements[key]
+        del self.sorted_keys[start:stop]
 
     def EXISTS(self, index):
-        index = extract_value(index)
-        index -= 1
-        return index >= 0 and index < len(self.inner_list)
+        return extract_value(index) in self.elements
 
     def COUNT(self):
-        return len(self.inner_list)
+        return len(self.elements)
 
     def LAST(self):
-        return len(self.inner_list)
+        if not self.sorted_keys:
+            return NULL_VALUE
+        return m(self.sorted_keys[-1])
 
     def FIRST(self):
-        return m(1) # FIXME
+        if not self.sorted_keys:
+            return NULL_VALUE
+        return m(self.sorted_keys[0])
 
     def NEXT(self, index):
-        index = extract_value(index)
-        if index >= len(self.inner_list):
-            return NULL()
-        return m(index + 1)
+        position = bisect_right(self.sorted_keys, extract_value(index))
+        if position >= len(self.sorted_keys):
+            return NULL_VALUE
+        return m(self.sorted_keys[position])
 
     def PRIOR(self, index):
-        index = extract_value(index)
-        if index == 1:
-            return NULL()
-        return m(index - 1)
-
-    def _safe_access_index(self, index: int):
-        length = len(self.inner_list)
-        if length >= index + 1:
-            return
-        length_missing = index + 1 - length
-        while length_missing > 0:
-            self.inner_list.append(self.default_ctor())
-            length_missing -= 1
+        position = bisect_left(self.sorted_keys, extract_value(index))
+        if position == 0:
+            return NULL_VALUE
+        return m(self.sorted_keys[position - 1])
+
+    def load(self, values: list):
+        """replaces the elements by values, indexed from 1. ie: by a BULK COLLECT"""
+        self.sorted_keys = list(range(1, len(values) + 1))
+        self.elements = dict(zip(self.sorted_keys, values))
+
+    def indices(self):
+        """the index of every element, ie: for a FORALL ... IN INDICES OF"""
+        return (m(key) for key in list(self.sorted_keys))
+
+    def _add_key(self, key):
+        if not self.sorted_keys or key > self.sorted_keys[-1]:
+            # tables are mostly filled in order
+            self.sorted_keys.append(key)
+        else:
+            insort(self.sorted_keys, key)
 
 def PLTABLE_OF(ctor):
     return lambda ctor=ctor: PLTABLE(ctor)
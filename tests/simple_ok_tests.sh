@@ -4,6 +4,7 @@ set -e
 
 root=$PWD
 pkgsDir=$root/tests/pkgs
+asyncPkgsDir=$root/tests/async_pkgs
 
 if test -n "$fast"; then
   python3="python3"
@@ -18,4 +19,12 @@ find $pkgsDir -type f | sort | while read pkg; do
   test "$output" = "OK"
 done
 
+# transpiled with --async
+find $asyncPkgsDir -type f | sort | while read pkg; do
+  testName=$(basename $pkg .pkg)
+  echo "testing async $testName"
+  output=$($python3 $root/built/generated_async/$testName.py)
+  test "$output" = "OK"
+done
+
 echo "everything OK"